@@ -0,0 +1,129 @@
+"""
+Офлайн-бенчмарк движка без docker-стендов.
+
+    python -m bench.run --sizes 10000 100000 --scan-entries 10000 --latency 0.002
+
+Для каждого размера синтетического лога меряется parse_proxy_log
+(строк/с, пиковая память по tracemalloc), затем полный run_scan против
+локального стенда (bench/target.py): задач/с и время скана.
+Сценарий runner'а в бенчмарке пустой — разведку заменяет готовый лог.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+from bench import synth_log, target
+from fuzzer import engine
+from fuzzer.options import ScanOptions
+from fuzzer.runners.storage import parse_proxy_log
+
+
+async def _noop_runner(base_url: str, client=None):
+    """Разведка не нужна: лог уже сгенерирован."""
+
+
+def bench_parse(log_path: Path) -> Dict[str, Any]:
+    lines = sum(1 for _ in log_path.open(encoding="utf-8"))
+
+    start = time.perf_counter()
+    endpoints, contexts = parse_proxy_log(log_path)
+    elapsed = time.perf_counter() - start
+
+    # отдельный прогон под tracemalloc — он сам по себе замедляет разбор
+    tracemalloc.start()
+    parse_proxy_log(log_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "lines": lines,
+        "endpoints": len(endpoints),
+        "seconds": round(elapsed, 3),
+        "lines_per_sec": round(lines / elapsed) if elapsed else None,
+        "peak_mem_mb": round(peak / 2**20, 1),
+    }
+
+
+async def bench_scan(log_path: Path, base_url: str, options: ScanOptions) -> Dict[str, Any]:
+    """run_scan целиком; рабочая директория — временная, рядом с логом."""
+    engine.RUNNERS.setdefault("bench", _noop_runner)
+    shutil.copy(log_path, "proxy_log.jsonl")
+
+    scan_id = f"bench-{int(time.time() * 1000)}"
+    start = time.perf_counter()
+    await engine.run_scan(scan_id, "bench", base_url, options)
+    elapsed = time.perf_counter() - start
+
+    status = engine.scan_status[scan_id]
+    return {
+        "jobs": status["total"],
+        "issues": status.get("issues"),
+        "seconds": round(elapsed, 3),
+        "jobs_per_sec": round(status["total"] / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline engine benchmark")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                    help="sizes of synthetic proxy logs, lines")
+    ap.add_argument("--scan-entries", type=int, default=10_000,
+                    help="log size for the end-to-end run_scan benchmark (0 to skip)")
+    ap.add_argument("--id-space", type=int, default=1000)
+    ap.add_argument("--latency", type=float, default=0.0, help="stand-in target latency, s")
+    ap.add_argument("--concurrency", type=int, default=ScanOptions().concurrency)
+    ap.add_argument("--per-host", type=int, default=ScanOptions().per_host)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--json", help="also write results to this file")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {"parse": {}, "scan": None}
+    cwd = os.getcwd()
+    json_out = Path(args.json).resolve() if args.json else None
+
+    with tempfile.TemporaryDirectory(prefix="pyfuzzer-bench-") as tmp, target.serve(args.latency) as base_url:
+        os.chdir(tmp)
+        try:
+            for size in args.sizes:
+                log_path = synth_log.generate(Path(tmp) / f"log-{size}.jsonl", size, base_url,
+                                              id_space=args.id_space)
+                results["parse"][size] = r = bench_parse(log_path)
+                print(f"parse_proxy_log {size:>9} lines: {r['lines_per_sec']} lines/s, "
+                      f"{r['endpoints']} endpoints, peak {r['peak_mem_mb']} MB")
+
+            if args.scan_entries:
+                log_path = synth_log.generate(Path(tmp) / "scan.jsonl", args.scan_entries, base_url,
+                                              id_space=args.id_space)
+                options = ScanOptions(
+                    direct=True,
+                    checkpoint=False,
+                    concurrency=args.concurrency,
+                    per_host=args.per_host,
+                    workers=args.workers,
+                )
+                results["scan"] = r = asyncio.run(bench_scan(log_path, base_url, options))
+                print(f"run_scan {args.scan_entries} lines: {r['jobs']} jobs in {r['seconds']} s "
+                      f"({r['jobs_per_sec']} jobs/s), {r['issues']} issues")
+        finally:
+            os.chdir(cwd)
+
+    # ru_maxrss в Linux — килобайты
+    results["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(f"max RSS: {results['max_rss_mb']} MB")
+
+    if json_out:
+        json_out.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Генератор синтетических proxy_log.jsonl в формате proxy/addon.py.
+
+Каждый "поток" даёт две строки (stage request и response), как у Recorder.
+Пути берутся из шаблонов juice-shop/DVWA с числовыми идентификаторами,
+так что число уникальных эндпоинтов растёт вместе с размером лога.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlparse
+
+import jwt  # pyjwt
+
+# (метод, шаблон пути, нужна ли авторизация), {n} — идентификатор
+PATHS = [
+    ("GET", "/", False),
+    ("POST", "/api/Users", False),
+    ("POST", "/rest/user/login", False),
+    ("GET", "/rest/user/whoami", True),
+    ("GET", "/rest/orders", True),
+    ("GET", "/rest/products/{n}", False),
+    ("GET", "/rest/basket/{n}", True),
+    ("GET", "/login.php", False),
+    ("POST", "/login.php", False),
+    ("GET", "/vulnerabilities/brute/", False),
+    ("GET", "/vulnerabilities/csrf/", False),
+    ("GET", "/assets/public/images/products/{n}.jpg", False),
+]
+
+
+def _tokens(users: int):
+    return [
+        jwt.encode({"id": i, "email": f"user{i}@local", "role": "customer"}, "synthetic-secret-" * 2, algorithm="HS256")
+        for i in range(users)
+    ]
+
+
+def generate(
+    path: str | Path,
+    entries: int,
+    base_url: str = "http://127.0.0.1:3000",
+    users: int = 5,
+    id_space: int = 1000,
+    seed: int = 0,
+) -> Path:
+    """
+    Записать лог примерно из entries строк. id_space ограничивает разброс
+    идентификаторов в путях, т.е. число уникальных эндпоинтов.
+    """
+    rnd = random.Random(seed)
+    parsed = urlparse(base_url)
+    tokens = _tokens(users)
+    sessions = [uuid.UUID(int=rnd.getrandbits(128)).hex for _ in range(users)]
+    t = time.time()
+
+    path = Path(path)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(entries // 2):
+            method, template, auth = rnd.choice(PATHS)
+            user = rnd.randrange(users)
+            req_headers = {
+                "Host": parsed.netloc,
+                "User-Agent": "python-httpx/0.28.1",
+                "Accept": "*/*",
+                "Cookie": f"PHPSESSID={sessions[user]}; language=en",
+            }
+            if auth:
+                req_headers["Authorization"] = f"Bearer {tokens[user]}"
+
+            entry = {
+                "t": t + i * 0.001,
+                "stage": "request",
+                "method": method,
+                "scheme": parsed.scheme,
+                "host": parsed.hostname,
+                "port": parsed.port,
+                "path": template.format(n=rnd.randrange(id_space)),
+                "query": {},
+                "req_headers": req_headers,
+                "req_body": json.dumps({"email": "test_fuzzer@local"}) if method == "POST" else "",
+                "status": None,
+                "resp_headers": None,
+                "resp_body": None,
+            }
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            entry["stage"] = "response"
+            entry["status"] = 200
+            entry["resp_headers"] = {"Content-Type": "application/json"}
+            entry["resp_body"] = json.dumps({"data": [rnd.random() for _ in range(8)]})
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic proxy_log.jsonl")
+    ap.add_argument("output")
+    ap.add_argument("--entries", type=int, default=10_000)
+    ap.add_argument("--base-url", default="http://127.0.0.1:3000")
+    ap.add_argument("--users", type=int, default=5)
+    ap.add_argument("--id-space", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    generate(args.output, args.entries, args.base_url, args.users, args.id_space, args.seed)
+
+
+if __name__ == "__main__":
+    main()
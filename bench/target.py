@@ -0,0 +1,129 @@
+"""
+Локальная замена стендов из docker-compose.yml для бенчмарков.
+
+Повторяет эндпоинты, на которые завязаны наши сценарии и атаки:
+JWT-часть juice-shop (логин, whoami, заказы, товары, корзины) и
+сессионную часть DVWA (login.php с PHPSESSID, модули vulnerabilities/).
+Подпись JWT не проверяется — как и на учебных стендах, поэтому атаки находят то же, что и там.
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import jwt  # pyjwt
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+SECRET = "bench-secret-bench-secret-bench-secret"
+
+
+def _bearer_claims(request: Request) -> Optional[dict]:
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(auth.split()[1], options={"verify_signature": False})
+    except Exception:
+        return None
+
+
+def create_app(latency: float = 0.0) -> FastAPI:
+    """latency — искусственная задержка каждого ответа, сек."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def delay(request: Request, call_next):
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return await call_next(request)
+
+    # === juice-shop ===
+
+    @app.get("/")
+    async def index():
+        return PlainTextResponse("OWASP Juice Shop (bench stand-in)")
+
+    @app.post("/api/Users")
+    async def signup():
+        return JSONResponse({"status": "success"}, status_code=201)
+
+    @app.post("/rest/user/login")
+    async def login():
+        token = jwt.encode(
+            {"id": 1, "email": "test_fuzzer@local", "role": "customer", "iat": int(time.time())},
+            SECRET,
+            algorithm="HS256",
+        )
+        return {"authentication": {"token": token, "bid": 1}}
+
+    @app.get("/rest/user/whoami")
+    async def whoami(request: Request):
+        claims = _bearer_claims(request)
+        return {"user": claims or {}}
+
+    @app.get("/rest/orders")
+    async def orders(request: Request):
+        if _bearer_claims(request) is None:
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        return [{"id": i, "total": i * 10} for i in range(20)]
+
+    @app.get("/rest/products/{pid}")
+    async def product(pid: str):
+        return {"id": pid, "name": f"product {pid}"}
+
+    @app.get("/rest/basket/{bid}")
+    async def basket(bid: str, request: Request):
+        if _bearer_claims(request) is None:
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        return {"id": bid, "items": []}
+
+    # === DVWA ===
+
+    @app.api_route("/login.php", methods=["GET", "POST"])
+    async def dvwa_login(request: Request):
+        resp = PlainTextResponse("login")
+        if "PHPSESSID" not in request.cookies:
+            resp.set_cookie("PHPSESSID", uuid.uuid4().hex)
+        return resp
+
+    @app.get("/vulnerabilities/{module}/")
+    async def dvwa_module(module: str, request: Request):
+        if "PHPSESSID" not in request.cookies:
+            return Response(status_code=302, headers={"location": "/login.php"})
+        return PlainTextResponse(f"module {module}")
+
+    @app.get("/logout.php")
+    async def dvwa_logout():
+        return Response(status_code=302, headers={"location": "/login.php"})
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def serve(latency: float = 0.0, port: Optional[int] = None) -> Iterator[str]:
+    """Поднять стенд в фоновом потоке, вернуть его base_url."""
+    port = port or free_port()
+    config = uvicorn.Config(create_app(latency), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="bench-target", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
@@ -0,0 +1,11 @@
+from fuzzer.plugins import ATTACKS_GROUP, PluginRegistry
+
+# атаки по имени; модуль атаки импортируется, только когда скан её выбрал
+ATTACKS = PluginRegistry(ATTACKS_GROUP, {
+    "jwt_role_escalation": "fuzzer.attacks.jwt_role_escalation:JwtRoleEscalation",
+    "jwt_replay": "fuzzer.attacks.jwt_replay:JwtReplay",
+    "session_fixation": "fuzzer.attacks.session_fixation:SessionFixation",
+    "payload_injection": "fuzzer.attacks.payload_injection:PayloadInjection",
+})
+
+__all__ = ["ATTACKS"]
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 import httpx
 from pydantic import BaseModel
 
 from fuzzer.runners.storage import Endpoint, AuthContext
 
+if TYPE_CHECKING:
+    from fuzzer.job_store import ScanStore
+    from fuzzer.options import ScanOptions
+
 
 class AttackResult(BaseModel):
     vulnerability: str
@@ -16,13 +20,63 @@ class AttackResult(BaseModel):
     evidence: Dict[str, Any]
 
 
+RESPONSE_SAMPLE = 512
+
+
+def response_evidence(resp: httpx.Response) -> Dict[str, Any]:
+    """Образец тела ответа для evidence; при ограниченном чтении — ещё и сведения об усечении."""
+    evidence: Dict[str, Any] = {"response_sample": resp.text[:RESPONSE_SAMPLE]}
+    if resp.extensions.get("body_truncated"):
+        evidence["response_truncated"] = True
+    if "body_sha256" in resp.extensions:
+        evidence["response_sha256"] = resp.extensions["body_sha256"]
+    return evidence
+
+
 class AttackStrategy(ABC):
+    """
+    Применимость атаки описывается двумя предикатами — от контекста и от эндпоинта.
+    Планировщик (fuzzer.planner) считает каждый из них один раз и строит по ним индекс.
+    Если применимость зависит от пары (endpoint, ctx) целиком, атака переопределяет
+    applicable(), и тогда она проверяется для каждой пары.
+    """
+
     name: str
+    # атака перебирает ctx.jwt_tokens по одному и больше от контекста не зависит:
+    # для новых токенов её достаточно запустить только с ними (см. fuzzer.pipeline)
+    per_token: bool = False
+
+    def context_applicable(self, ctx: AuthContext) -> bool:
+        """Применима ли атака к контексту (не зависит от эндпоинта)."""
+        return True
+
+    def endpoint_applicable(self, endpoint: Endpoint) -> bool:
+        """Применима ли атака к эндпоинту (не зависит от контекста)."""
+        return True
 
-    @abstractmethod
     def applicable(self, endpoint: Endpoint, ctx: AuthContext) -> bool:
         """Можно ли применять атаку к данному эндпоинту и контексту."""
-        raise NotImplementedError
+        return self.context_applicable(ctx) and self.endpoint_applicable(endpoint)
+
+    @classmethod
+    def from_options(cls, options: ScanOptions) -> Optional[AttackStrategy]:
+        """Экземпляр атаки для скана с такими параметрами; None — атаке нечего делать (например, нет словарей)."""
+        return cls()
+
+    def bind(self, scan_id: str, store: Optional[ScanStore]):
+        """Привязать атаку к скану. Атаки с долгим перебором сохраняют в store позицию внутри задачи."""
+
+    def prepare(self):
+        """Тяжёлая подготовка перед атаками (индексы, словари). Вызывается один раз и вне event loop."""
+
+    def signature(self) -> str:
+        """Всё, от чего зависят находки атаки; при смене сигнатуры прошлые результаты не переиспользуются."""
+        return self.name
+
+    @classmethod
+    def precomputable(cls) -> bool:
+        """Раскладывается ли applicable() на два независимых предиката."""
+        return cls.applicable is AttackStrategy.applicable
 
     @abstractmethod
     async def run(
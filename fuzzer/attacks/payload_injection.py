@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from fuzzer.attacks.base import AttackStrategy, AttackResult, response_evidence
+from fuzzer.planner import context_digest, job_key
+from fuzzer.runners.storage import Endpoint, AuthContext
+from fuzzer.wordlists import PayloadSource, DEFAULT_BATCH
+
+log = logging.getLogger("fuzzer")
+
+# короткие payload'ы ("a", "1") находятся в любом ответе — отражение для них не показательно
+MIN_REFLECTED = 4
+
+FORBIDDEN = {"content-length", "transfer-encoding", "host", "connection"}
+
+# до цели не достучаться — от payload'а это не зависит, задача считается упавшей
+UNREACHABLE = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class PayloadInjection(AttackStrategy):
+    """
+    Подстановка payload'ов из словарей в параметры запроса и поля тела.
+
+    Payload'ы берутся из PayloadSource лениво, пачками по batch; запросы пачки
+    уходят одновременно. После каждой пачки номер следующего payload'а и находки
+    сохраняются в хранилище скана, и продолженный скан начинает перебор с этого
+    номера. Если цель недоступна (ошибка соединения или ни один запрос пачки
+    не прошёл), задача падает, а позиция остаётся перед этой пачкой.
+
+    Срабатывание — отражение payload'а в начале ответа или ошибка сервера (5xx).
+    На каждое место вставки фиксируется первое срабатывание каждого вида,
+    чтобы словарь на миллион строк не давал миллион находок.
+    """
+
+    name = "payload_injection"
+
+    def __init__(self, source: PayloadSource, batch: int = DEFAULT_BATCH, limit: int = 0):
+        self.source = source
+        self.batch = max(1, batch)
+        self.limit = limit
+        self.scan_id = ""
+        self.store = None
+
+    @classmethod
+    def from_options(cls, options) -> Optional[PayloadInjection]:
+        if not options.wordlists:
+            return None
+        return cls(PayloadSource(options.wordlists), batch=options.payload_batch, limit=options.payload_limit)
+
+    def bind(self, scan_id, store):
+        self.scan_id = scan_id
+        self.store = store
+
+    def prepare(self):
+        # индекс словарей строится один раз, дальше переиспользуется с диска
+        log.info(f"Wordlists: {len(self.source)} unique payloads")
+
+    def signature(self) -> str:
+        # другие словари или другой лимит — другой набор payload'ов
+        return f"{self.name}:{self.source.index_path.stem}:{self.limit}"
+
+    def endpoint_applicable(self, endpoint: Endpoint) -> bool:
+        return bool(endpoint.params) or isinstance(endpoint.body, dict) and bool(endpoint.body)
+
+    @staticmethod
+    def _slots(endpoint: Endpoint) -> List[Tuple[str, str]]:
+        """Места вставки: ("query", имя) и ("body", ключ)."""
+        slots = [("query", k) for k in (endpoint.params or {})]
+        if isinstance(endpoint.body, dict):
+            slots += [("body", k) for k in endpoint.body]
+        return slots
+
+    @staticmethod
+    def _inject(endpoint: Endpoint, slot: Tuple[str, str], payload: str) -> Tuple[Dict[str, Any], Optional[str]]:
+        where, name = slot
+        params = dict(endpoint.params or {})
+        body = endpoint.body
+        if where == "query":
+            params[name] = payload
+        else:
+            body = {**body, name: payload}
+        content = json.dumps(body) if isinstance(body, dict) and body else None
+        return params, content
+
+    async def run(
+        self,
+        endpoint: Endpoint,
+        ctx: AuthContext,
+        client: httpx.AsyncClient,
+    ) -> List[AttackResult]:
+        url = endpoint.url
+        headers = {k: v for k, v in (endpoint.headers or {}).items() if k.lower() not in FORBIDDEN}
+        slots = self._slots(endpoint)
+
+        # продолжение скана: перебор идёт с сохранённой позиции, находки до неё уже есть
+        key = job_key(endpoint, context_digest(ctx), self.name)
+        start, results = (0, [])
+        if self.store is not None:
+            start, results = self.store.load_progress(self.scan_id, key)
+        reported = {((r.evidence["location"], r.evidence["parameter"]), r.vulnerability) for r in results}
+
+        limit = self.limit
+        if limit:
+            if start >= limit:
+                return results
+            limit -= start
+
+        async def probe(slot: Tuple[str, str], n: int, payload: str):
+            params, content = self._inject(endpoint, slot, payload)
+            resp = await client.request(
+                endpoint.method,
+                url,
+                params=params,
+                headers=headers,
+                cookies=ctx.cookies,
+                content=content,
+            )
+
+            if resp.status_code >= 500:
+                kind, severity = "payload_server_error", "medium"
+            elif len(payload) >= MIN_REFLECTED and payload in resp.text:
+                kind, severity = "payload_reflected", "low"
+            else:
+                return
+
+            if (slot, kind) in reported:
+                return
+            reported.add((slot, kind))
+            results.append(
+                AttackResult(
+                    vulnerability=kind,
+                    endpoint=f"{endpoint.method} {endpoint.path}",
+                    severity=severity,
+                    evidence={
+                        "location": slot[0],
+                        "parameter": slot[1],
+                        "payload": payload[:256],
+                        "payload_index": n,
+                        "status_code": resp.status_code,
+                        **response_evidence(resp),
+                    },
+                )
+            )
+
+        for batch in self.source.batches(self.batch, start=start, limit=limit):
+            outcomes = await asyncio.gather(*(
+                probe(slot, n, payload) for n, payload in batch for slot in slots
+            ), return_exceptions=True)
+            errors = [e for e in outcomes if isinstance(e, BaseException)]
+            # отдельный запрос может упасть из-за самого payload'а (таймаут, обрыв) —
+            # это не повод бросать задачу; недоступная цель и сплошные ошибки — повод
+            for exc in errors:
+                if not isinstance(exc, httpx.HTTPError) or isinstance(exc, UNREACHABLE):
+                    raise exc
+            if errors and len(errors) == len(outcomes):
+                raise errors[0]
+            if self.store is not None:
+                self.store.save_progress(self.scan_id, key, batch[-1][0] + 1, results)
+
+        return results
@@ -4,7 +4,7 @@ from typing import List
 
 import httpx
 
-from fuzzer.attacks.base import AttackStrategy, AttackResult
+from fuzzer.attacks.base import AttackStrategy, AttackResult, response_evidence
 from fuzzer.runners.storage import Endpoint, AuthContext
 
 
@@ -21,7 +21,8 @@ class SessionFixation(AttackStrategy):
 
     name = "session_fixation"
 
-    def applicable(self, endpoint: Endpoint, ctx: AuthContext) -> bool:
+    def context_applicable(self, ctx: AuthContext) -> bool:
+        # от эндпоинта не зависит — планировщик проверяет один раз на контекст
         if not ctx.cookies:
             return False
         keys = [k.lower() for k in ctx.cookies.keys()]
@@ -34,7 +35,7 @@ class SessionFixation(AttackStrategy):
         client: httpx.AsyncClient,
     ) -> List[AttackResult]:
         results: List[AttackResult] = []
-        url = endpoint.path
+        url = endpoint.url
 
         session_cookies = {
             k: v
@@ -61,7 +62,7 @@ class SessionFixation(AttackStrategy):
                     evidence={
                         "session_cookies": list(session_cookies.keys()),
                         "status_code": resp.status_code,
-                        "response_sample": resp.text[:512],
+                        **response_evidence(resp),
                     },
                 )
             )
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any
+
+import httpx
+
+# сколько байт тела (после снятия Content-Encoding) оставлять для доказательств и детекта
+DEFAULT_MAX_BODY = 4096
+
+# недочитанный хвост не больше этого дочитывается, чтобы соединение вернулось в пул;
+# хвост больше — соединение закрывается (HTTP/1.1) или поток сбрасывается (HTTP/2)
+DRAIN_LIMIT = 64 * 1024
+
+# заголовки, которые не описывают усечённое тело ответа
+_BODY_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class BoundedReader:
+    """
+    Ограниченное чтение ответов поверх httpx.AsyncClient.
+
+    Атакам нужны статус, заголовки и начало тела, а не весь ответ: тело читается
+    потоком, сохраняются первые max_body байт, остальное не скачивается.
+    С hash_body=True тело всё же дочитывается до конца, но в памяти остаётся только
+    префикс и sha256 всего тела.
+
+    Возвращается обычный httpx.Response с усечённым телом; сведения об усечении
+    лежат в response.extensions: body_truncated, body_bytes (сколько прочитано),
+    body_sha256 (только с hash_body). Остальные атрибуты проксируются в клиент.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, max_body: int = DEFAULT_MAX_BODY, hash_body: bool = False):
+        self.client = client
+        self.max_body = max(0, max_body)
+        self.hash_body = hash_body
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def request(self, method: str, url: httpx.URL | str, **kwargs) -> httpx.Response:
+        send_kwargs = {k: kwargs.pop(k) for k in ("auth", "follow_redirects") if k in kwargs}
+        request = self.client.build_request(method, url, **kwargs)
+        return await self.send(request, **send_kwargs)
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        kwargs.pop("stream", None)
+        resp = await self.client.send(request, stream=True, **kwargs)
+        try:
+            prefix, read, truncated, digest = await self._read(resp)
+        finally:
+            await resp.aclose()
+
+        headers = [(k, v) for k, v in resp.headers.multi_items() if k.lower() not in _BODY_HEADERS]
+        extensions = dict(resp.extensions)
+        extensions["body_truncated"] = truncated
+        extensions["body_bytes"] = read
+        if digest is not None:
+            extensions["body_sha256"] = digest
+
+        return httpx.Response(
+            resp.status_code,
+            headers=headers,
+            content=prefix,
+            request=request,
+            extensions=extensions,
+            history=resp.history,
+        )
+
+    async def _read(self, resp: httpx.Response):
+        buf = bytearray()
+        read = 0
+        sha = hashlib.sha256() if self.hash_body else None
+
+        # хвост небольшой и известной длины — дешевле дочитать, чем терять соединение
+        length = resp.headers.get("content-length")
+        drain = sha is not None or (
+            length is not None and length.isdigit() and int(length) <= self.max_body + DRAIN_LIMIT
+        )
+
+        stopped = False
+        async for chunk in resp.aiter_bytes():
+            read += len(chunk)
+            if sha is not None:
+                sha.update(chunk)
+            if len(buf) < self.max_body:
+                buf += chunk[:self.max_body - len(buf)]
+            if len(buf) >= self.max_body and not drain:
+                stopped = True
+                break
+
+        truncated = stopped or read > self.max_body
+        return bytes(buf), read, truncated, sha.hexdigest() if sha is not None else None
@@ -1,84 +1,366 @@
-import httpx
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+from urllib.parse import urljoin
+
+import httpx
+
 from fuzzer.runners import RUNNERS
-from fuzzer.runners.storage import parse_proxy_log
-from fuzzer.report import write_report
-from fuzzer.attacks.jwt_role_escalation import JwtRoleEscalation
-from fuzzer.attacks.jwt_replay import JwtReplay
-from fuzzer.attacks.session_fixation import SessionFixation
+from fuzzer.runners.storage import (
+    parse_proxy_log, host_key, scan_traffic_path, traffic_size,
+    ATTACK_MARKER, SCAN_HEADER, FLUSH_HEADER, FLUSH_ACK,
+)
+from fuzzer.pipeline import CrawlPipeline
+from fuzzer.request_cache import RequestCache
+from fuzzer.bounded_reads import BoundedReader
+from fuzzer.recording import AttackTrafficRecorder
+from fuzzer.http_client import ClientFactory
+from fuzzer.rate_control import RateController
+from fuzzer.options import ScanOptions
+from fuzzer.job_store import get_store
+from fuzzer.incremental import IncrementalScan, PROBE_MAX_BODY
+from fuzzer.sharding import run_sharded
+from fuzzer.metrics import forget_scan, phase_timer
+from fuzzer.templating import collapse_endpoints
+from fuzzer.report import IssueSink
+from fuzzer.report_store import get_report_store
+from fuzzer.planner import build_plan
+from fuzzer.scheduler import AttackScheduler
+from fuzzer.attacks import ATTACKS
 
 log = logging.getLogger("fuzzer")
 
-ATTACKS = [
-    JwtRoleEscalation(),
-    JwtReplay(),
-    SessionFixation(),
-]
-
 scan_status = {}
 
+# адрес запроса-сигнала: до цели он доходит, только если Recorder не знает FLUSH_HEADER
+FLUSH_PATH = "/__fuzzer_flush"
+# Recorder без сигнала сбрасывает буфер раз в recorder_flush_interval (0.5 с по умолчанию);
+# трафик считается записанным, когда файлы не росли дольше SETTLE_QUIET
+SETTLE_QUIET = 1.0
+SETTLE_POLL = 0.25
+SETTLE_MAX = 10.0
+
+
+def scan_attacks(options: ScanOptions) -> list:
+    """
+    Атаки скана: выбранные в options.attacks, по умолчанию все зарегистрированные.
+    Модули атак импортируются здесь, при первом выборе. Атаки, которым нечего делать
+    с такими параметрами (payload_injection без словарей), пропускаются.
+    """
+    names = options.attacks or ATTACKS.names()
+    unknown = [name for name in names if name not in ATTACKS]
+    if unknown:
+        raise ValueError(f"unknown attacks: {', '.join(unknown)}")
+
+    attacks = []
+    for name in names:
+        attack = ATTACKS[name].from_options(options)
+        if attack is None:
+            if options.attacks:
+                log.warning(f"Attack {name} is not configured for this scan, skipping")
+            continue
+        attacks.append(attack)
+    return attacks
+
+
+async def flush_recorder(client: httpx.AsyncClient, base_url: str, scan_id: str):
+    """
+    Дождаться, пока Recorder запишет на диск весь трафик разведки скана.
+    Последняя пачка иначе может сидеть в его буфере, когда лог уже читается,
+    а в ней как раз запросы после логина (с токеном).
+    """
+    try:
+        resp = await client.request("GET", urljoin(base_url, FLUSH_PATH), headers={FLUSH_HEADER: "1"})
+    except httpx.HTTPError as exc:
+        # прокси недоступен — и записывать было некому
+        log.warning(f"[SCAN {scan_id}] Recorder flush failed: {exc!r}")
+        return
+    if resp.status_code == 204 and FLUSH_ACK in resp.headers:
+        return
+
+    # старый Recorder или сброс не успел (504): ждём, пока файлы трафика перестанут расти
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SETTLE_MAX
+    size, quiet_since = traffic_size(scan_id), loop.time()
+    while loop.time() < deadline and loop.time() - quiet_since < SETTLE_QUIET:
+        await asyncio.sleep(SETTLE_POLL)
+        current = traffic_size(scan_id)
+        if current != size:
+            size, quiet_since = current, loop.time()
+
+
+def host_ceiling(options: ScanOptions) -> int:
+    """
+    Сколько запросов на хост атаки могут держать одновременно: per_host задач,
+    а payload_injection отправляет пачку payload'ов одной задачи параллельно.
+    """
+    fanout = max(1, options.payload_batch) if options.wordlists else 1
+    return max(1, options.per_host) * fanout
+
+
+@asynccontextmanager
+async def attack_client(
+    factory: ClientFactory,
+    scan_id: str,
+    options: ScanOptions,
+    on_rate_change: Optional[Callable[[Dict[str, int]], None]] = None,
+):
+    """
+    Клиент для фазы атак: общий пул, AIMD-лимит на хост, пометка трафика,
+    ограниченное чтение, дедупликация, выборочная запись.
+    on_rate_change получает текущие лимиты по хостам при каждом их изменении.
+    """
+    # прокси нужен только для разведки; в прямом режиме атаки идут на цель напрямую,
+    # а их трафик при желании пишется выборочно в attack_log.jsonl
+    client_kwargs = {}
+    recorder = None
+    if options.direct and options.record_sample > 0:
+        recorder = AttackTrafficRecorder(scan_id, options.record_sample)
+        client_kwargs["event_hooks"] = {"response": [recorder.on_response]}
 
-def make_progress_bar(done: int, total: int, length: int = 28) -> str:
-    if total == 0:
-        total = 1
+    # цель не перегружается (429/503 дают ложные отрицания), но и запас пропускной способности не теряется
+    if options.rate.enabled:
+        client_kwargs["rate"] = RateController(options.rate, scan_id, on_rate_change, ceiling=host_ceiling(options))
 
-    filled = int(length * (done / total))
-    empty = length - filled
-    return f"[{'#' * filled}{'-' * empty}] {done}/{total} ({round(done / total * 100)}%)"
+    try:
+        # трафик атак помечается, чтобы разбор лога не принял его за разведку
+        client = factory.client(
+            proxied=not options.direct,
+            headers={ATTACK_MARKER: scan_id},
+            **client_kwargs,
+        )
 
+        # атакам хватает начала тела — остальное не скачивается
+        if options.max_response_bytes > 0:
+            client = BoundedReader(client, options.max_response_bytes, options.hash_responses)
+
+        # одинаковые запросы разных атак уходят на цель один раз
+        if options.dedupe_requests:
+            cache = RequestCache(client)
+            yield cache
+            log.info(f"[SCAN {scan_id}] Request cache: "
+                     f"{cache.misses} sent, {cache.hits} deduplicated")
+        else:
+            yield client
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+async def run_scan(
+    scan_id: str,
+    target: str,
+    base_url: str,
+    options: ScanOptions | None = None,
+    resume: bool = False,
+):
+    options = options or ScanOptions()
 
-async def run_scan(scan_id: str, target: str, base_url: str):
     scan_status[scan_id] = {
         "status": "running",
+        "started": time.time(),
         "done": 0,
         "total": 1,
         "progress": 0.0,
+        "issues": 0,
+        # задачи, в которых атака упала (цель недоступна и т.п.) — при продолжении выполнятся снова
+        "failed": 0,
+        # текущие AIMD-лимиты запросов атак по хостам
+        "rate_limits": {},
     }
 
+    # чекпоинты: статус скана, план и каждая выполненная задача пишутся в SQLite
+    store = get_store() if options.checkpoint else None
+    if store is not None:
+        store.create_scan(scan_id, target, base_url, options.model_dump())
+
+    # находки не копятся в памяти, а сразу уходят в NDJSON-файл отчёта
+    sink = IssueSink(scan_id)
+
+    def rate_changed(limits: Dict[str, int]):
+        scan_status[scan_id]["rate_limits"] = limits
+
+    def job_done(key: str, results):
+        sink.put_many(results)
+        scan_status[scan_id]["issues"] = sink.total
+        if store is not None:
+            store.record_job(scan_id, key, results)
+
+    def job_failed(key: str):
+        # не в чекпоинт и не в отчёт: /resume выполнит задачу заново;
+        # счётчик failed ведут планировщик и координатор шардов
+        if incremental is not None:
+            incremental.mark_failed(key)
+
     log.info(f"[SCAN {scan_id}] Scenario start for {target} at {base_url}")
 
-    await RUNNERS[target](base_url)
+    if options.pipelined and options.workers > 1:
+        log.warning(f"[SCAN {scan_id}] Pipelined mode runs in-process, ignoring workers={options.workers}")
 
-    endpoints, contexts = parse_proxy_log()
-    total_work = len(endpoints) * len(contexts) * len(ATTACKS)
-    scan_status[scan_id]["total"] = max(1, total_work)
+    # база прошлого скана хранится в SQLite; в конвейере атаки стартуют до конца разведки — сравнивать не с чем
+    incremental = None
+    if options.incremental:
+        if store is None:
+            log.warning(f"[SCAN {scan_id}] Incremental mode needs checkpoint=True, running a full scan")
+        elif options.pipelined:
+            log.warning(f"[SCAN {scan_id}] Incremental mode is not supported in pipelined mode, running a full scan")
+        elif not resume:
+            incremental = IncrementalScan(store, target, base_url)
 
-    log.info(f"[SCAN {scan_id}] Parsed {len(endpoints)} endpoints, "
-             f"{len(contexts)} contexts → {total_work} tasks")
+    try:
+        attacks = scan_attacks(options)
+        for attack in attacks:
+            attack.bind(scan_id, store)
+            await asyncio.to_thread(attack.prepare)
 
-    issues = []
-    PROXY = "http://127.0.0.1:8083"
+        # один пул соединений на скан: и для runner'а, и для атак
+        async with ClientFactory(options.http, scan_id=scan_id) as factory:
+            # метка скана: Recorder пишет трафик разведки в отдельный сегмент скана
+            runner_client = factory.client(proxied=True, headers={SCAN_HEADER: scan_id})
 
-    async with httpx.AsyncClient(proxy=PROXY, verify=False) as client:
-        job_counter = 0
+            async def recon():
+                await RUNNERS[target](base_url, runner_client)
+                await flush_recorder(runner_client, base_url, scan_id)
 
-        for ep in endpoints:
-            for ctx in contexts:
-                for attack in ATTACKS:
-                    job_counter += 1
+            plan = store.load_plan(scan_id) if (store is not None and resume) else None
 
-                    scan_status[scan_id]["done"] = job_counter
-                    scan_status[scan_id]["progress"] = job_counter / total_work
+            if options.pipelined and plan is None:
+                async with attack_client(factory, scan_id, options, rate_changed) as client:
+                    scheduler = AttackScheduler(
+                        scan_id,
+                        client,
+                        status=scan_status[scan_id],
+                        concurrency=options.concurrency,
+                        per_host=options.per_host,
+                        on_job_done=lambda job, results: job_done(job.key, results),
+                        collect=False,
+                        on_job_failed=lambda job, exc: job_failed(job.key),
+                    )
+                    # атаки стартуют по мере обнаружения эндпоинтов
+                    scheduler.start()
+                    with phase_timer(scan_id, "attack"):
+                        try:
+                            with phase_timer(scan_id, "runner"):
+                                pipeline = CrawlPipeline(
+                                    scan_id, scheduler, attacks,
+                                    log_path=scan_traffic_path(scan_id, base_url),
+                                    representatives=options.path_representatives,
+                                )
+                                await pipeline.run(recon())
+                        except BaseException:
+                            await scheduler.cancel()
+                            raise
+                        await scheduler.join()
+            else:
+                completed = {}
+                if plan is not None:
+                    # продолжение: разведку не повторяем, выполненные задачи пропускаем
+                    endpoints, contexts = plan
+                    completed = store.completed_jobs(scan_id)
+                    log.info(f"[SCAN {scan_id}] Resuming: {len(completed)} jobs already done")
+                else:
+                    with phase_timer(scan_id, "runner"):
+                        await recon()
+                    with phase_timer(scan_id, "parse"):
+                        endpoints, contexts = parse_proxy_log(scan_id=scan_id, hosts=[host_key(base_url)])
+                        parsed_count = len(endpoints)
+                        endpoints = collapse_endpoints(endpoints, options.path_representatives)
+                    if len(endpoints) < parsed_count:
+                        log.info(f"[SCAN {scan_id}] Path templating: "
+                                 f"{parsed_count} → {len(endpoints)} endpoints")
+                    if store is not None:
+                        store.save_plan(scan_id, endpoints, contexts)
 
-                    bar = make_progress_bar(job_counter, total_work)
+                for results in completed.values():
+                    sink.put_many(results)
+                scan_status[scan_id]["issues"] = sink.total
+                skip = frozenset(completed)
 
-                    log.info(
-                        f"[SCAN {scan_id}] {bar} | "
-                        f"{attack.__class__.__name__} -> {ep.method} {ep.path}"
+                # применимость считается здесь один раз — в total только реальная работа
+                plan = build_plan(endpoints, contexts, attacks, skip, scan_id)
+
+                if incremental is not None:
+                    # отпечатки снимаются отдельным клиентом: атакам хватает начала тела, отпечатку — нет
+                    probe_client = BoundedReader(
+                        factory.client(proxied=not options.direct, headers={ATTACK_MARKER: scan_id}),
+                        PROBE_MAX_BODY,
                     )
+                    with phase_timer(scan_id, "probe"):
+                        await incremental.probe(probe_client, endpoints, options.concurrency)
+                    carried = incremental.carry_over(plan)
+                    for key, results in carried.items():
+                        job_done(key, results)
+                    completed.update(carried)
+                    skip = frozenset(completed)
+                    scan_status[scan_id]["carried_over"] = len(carried)
 
-                    if attack.applicable(ep, ctx):
-                        try:
-                            results = await attack.run(ep, ctx, client)
-                            issues.extend(results)
-                        except Exception as exc:
-                            log.warning(
-                                f"[SCAN {scan_id}] ERROR in {attack.__class__.__name__}: {exc}"
+                total_work = len(plan) + len(completed)
+                scan_status[scan_id]["total"] = max(1, total_work)
+                scan_status[scan_id]["done"] = len(completed)
+
+                not_applicable = sum(plan.not_applicable.values())
+                log.info(f"[SCAN {scan_id}] Parsed {len(endpoints)} endpoints, "
+                         f"{len(contexts)} contexts → {total_work} tasks "
+                         f"({not_applicable} not applicable)")
+
+                with phase_timer(scan_id, "attack"):
+                    if options.workers > 1:
+                        # атаки в отдельных процессах, находки сливаются в один отчёт
+                        await run_sharded(
+                            scan_id, endpoints, contexts, attacks, options, scan_status[scan_id],
+                            skip=skip, on_job_done=job_done, collect=False, total=total_work,
+                            on_job_failed=job_failed,
+                        )
+                    else:
+                        async with attack_client(factory, scan_id, options, rate_changed) as client:
+                            scheduler = AttackScheduler(
+                                scan_id,
+                                client,
+                                status=scan_status[scan_id],
+                                concurrency=options.concurrency,
+                                per_host=options.per_host,
+                                on_job_done=lambda job, results: job_done(job.key, results),
+                                already_done=len(completed),
+                                collect=False,
+                                on_job_failed=lambda job, exc: job_failed(job.key),
                             )
+                            await scheduler.run(plan.jobs)
+    except asyncio.CancelledError:
+        scan_status[scan_id]["status"] = "cancelled"
+        if store is not None:
+            store.set_status(scan_id, "cancelled")
+        log.info(f"[SCAN {scan_id}] Scan cancelled")
+        raise
+    except Exception:
+        scan_status[scan_id]["status"] = "failed"
+        if store is not None:
+            store.set_status(scan_id, "failed")
+        log.exception(f"[SCAN {scan_id}] Scan failed")
+        raise
+    finally:
+        sink.close()
+        # после фазы атак метрики скана больше не пишутся
+        forget_scan(scan_id)
+
+    # итоговый отчёт собирается из NDJSON вне event loop и сразу попадает в индекс
+    await asyncio.to_thread(get_report_store().finalize, scan_id, target, base_url, sink.summary())
 
-    write_report(scan_id, target, base_url, issues)
+    if incremental is not None:
+        incremental.save(scan_id)
 
-    scan_status[scan_id]["status"] = "finished"
+    # отчёт есть, но неполный: упавшие задачи (или целый шард) не выполнены, скан можно продолжить
+    failed = scan_status[scan_id]["failed"]
+    failed_shards = scan_status[scan_id].get("failed_shards", 0)
+    final = "partial" if failed or failed_shards else "finished"
+    scan_status[scan_id]["status"] = final
     scan_status[scan_id]["progress"] = 1.0
+    if store is not None:
+        store.set_status(scan_id, final)
 
-    log.info(f"[SCAN {scan_id}] Scan complete. Issues: {len(issues)}")
+    if final == "partial":
+        log.warning(f"[SCAN {scan_id}] Scan partial: {failed} jobs failed, {failed_shards} shards lost. "
+                    f"Issues: {sink.total}")
+    else:
+        log.info(f"[SCAN {scan_id}] Scan complete. Issues: {sink.total}")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from fuzzer.metrics import InstrumentedTransport
+from fuzzer.rate_control import RateControlledTransport, RateController
+
+log = logging.getLogger("fuzzer")
+
+PROXY = "http://127.0.0.1:8083"
+
+
+class ClientSettings(BaseModel):
+    """Настройки пула соединений, общие для runner'а и атак одного скана."""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    http2: bool = False
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ClientFactory:
+    """
+    Клиенты httpx на время одного скана.
+
+    Пул соединений живёт в транспорте: по одному на режим (через прокси / напрямую),
+    и все клиенты скана — runner'а и атак — ходят через него, так что установка
+    соединения (TCP/TLS) оплачивается один раз на хост. Сами клиенты раздельные,
+    чтобы cookie, выставленные ответами на атаки, не попадали в сессию runner'а.
+    """
+
+    def __init__(self, settings: Optional[ClientSettings] = None, proxy: str = PROXY, scan_id: str = ""):
+        self.settings = settings or ClientSettings()
+        self.proxy = proxy
+        self.scan_id = scan_id
+        self._transports: Dict[bool, httpx.AsyncBaseTransport] = {}
+
+    def client(self, proxied: bool = True, rate: Optional[RateController] = None, **kwargs) -> httpx.AsyncClient:
+        """
+        Новый клиент поверх общего пула. Закрывать его не нужно — пул закрывает фабрика.
+        rate — AIMD-лимит запросов на хост, только для этого клиента.
+        """
+        s = self.settings
+        transport = self._transport(proxied)
+        if rate is not None:
+            transport = RateControlledTransport(transport, rate)
+        return httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(s.timeout, connect=s.connect_timeout),
+            **kwargs,
+        )
+
+    def _transport(self, proxied: bool) -> httpx.AsyncBaseTransport:
+        transport = self._transports.get(proxied)
+        if transport is not None:
+            return transport
+
+        s = self.settings
+        http2 = s.http2
+        if http2 and not _http2_available():
+            log.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+
+        transport = httpx.AsyncHTTPTransport(
+            verify=False,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=s.max_connections,
+                max_keepalive_connections=s.max_keepalive_connections,
+                keepalive_expiry=s.keepalive_expiry,
+            ),
+            proxy=self.proxy if proxied else None,
+        )
+        # метрики запросов (/metrics) снимаются на уровне транспорта
+        transport = InstrumentedTransport(transport, self.scan_id)
+        self._transports[proxied] = transport
+        return transport
+
+    async def aclose(self):
+        for transport in self._transports.values():
+            await transport.aclose()
+        self._transports.clear()
+
+    async def __aenter__(self) -> "ClientFactory":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+@asynccontextmanager
+async def borrow_client(client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """Отдать переданный клиент как есть или создать временный (через прокси) и закрыть после."""
+    if client is not None:
+        yield client
+        return
+
+    async with ClientFactory() as factory:
+        yield factory.client(proxied=True)
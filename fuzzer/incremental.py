@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Set
+
+import httpx
+
+from fuzzer.attacks.base import AttackResult
+from fuzzer.job_store import ScanStore
+from fuzzer.models import Endpoint, AuthContext
+from fuzzer.planner import AttackPlan
+from fuzzer.scheduler import AttackJob
+
+log = logging.getLogger("fuzzer")
+
+# повторно отправлять для отпечатка можно только запросы без побочных эффектов;
+# у остальных отпечатка нет, и они атакуются каждый раз
+PROBE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# сколько байт тела ответа входит в отпечаток
+PROBE_MAX_BODY = 64 * 1024
+
+# заголовки ответа, смена которых означает другое поведение эндпоинта
+KEY_HEADERS = ("content-type", "location", "allow", "www-authenticate", "content-disposition")
+
+# claims, которые меняются при каждом логине и не говорят о смене прав
+VOLATILE_CLAIMS = {"iat", "exp", "nbf", "jti", "auth_time"}
+
+FORBIDDEN = {"content-length", "transfer-encoding", "host", "connection"}
+
+# изменчивые части ответа (идентификаторы, токены, время) заменяются заглушками
+_VOLATILE = [
+    (re.compile(rb"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I), b"<uuid>"),
+    (re.compile(rb"eyJ[\w-]+\.[\w-]+\.[\w-]*"), b"<jwt>"),
+    (re.compile(rb"\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d+)?(?:Z|[+-]\d\d:?\d\d)?"), b"<time>"),
+    (re.compile(rb"\b[0-9a-f]{16,}\b", re.I), b"<hex>"),
+    (re.compile(rb"\b\d{9,}\b"), b"<num>"),
+    (re.compile(rb"nonce=([\"'])[^\"']*\1", re.I), b"nonce=<nonce>"),
+    (re.compile(rb"(name=[\"']?[\w-]*(?:csrf|token)[\w-]*[\"']?[^>]*?value=)([\"'])[^\"']*\2", re.I), rb"\1<token>"),
+]
+
+
+def normalize_body(body: bytes) -> bytes:
+    for pattern, repl in _VOLATILE:
+        body = pattern.sub(repl, body)
+    return body
+
+
+def response_fingerprint(resp: httpx.Response) -> str:
+    """Отпечаток ответа: статус, ключевые заголовки и хэш нормализованного тела."""
+    parts = [str(resp.status_code)]
+    for name in KEY_HEADERS:
+        value = resp.headers.get(name)
+        if value is not None:
+            parts.append(f"{name}:{normalize_body(value.encode('utf-8', 'replace')).decode('utf-8', 'replace')}")
+    # у cookie важны имена, значения у сессионных меняются всегда
+    names = sorted({c.split("=", 1)[0].strip() for c in resp.headers.get_list("set-cookie")})
+    parts.append("set-cookie:" + ",".join(names))
+
+    h = hashlib.sha1("\n".join(parts).encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_body(resp.content))
+    return h.hexdigest()
+
+
+def endpoint_key(endpoint: Endpoint) -> str:
+    key = f"{endpoint.method} {endpoint.url}"
+    if endpoint.params:
+        key += "?" + "&".join(sorted(endpoint.params))
+    return key
+
+
+def context_shape(ctx: AuthContext) -> str:
+    """
+    Отпечаток контекста авторизации без изменчивых значений: имена cookie и заголовков,
+    alg и claims токенов без iat/exp/jti. Новый токен той же роли — тот же контекст.
+    """
+    # pyjwt импортируется, только если скан действительно инкрементальный
+    from fuzzer.attacks.jwt_tokens import analyze_token
+
+    tokens = []
+    for token in ctx.jwt_tokens:
+        analysis = analyze_token(token)
+        if analysis is None:
+            tokens.append("opaque")
+            continue
+        claims = {k: v for k, v in analysis.claims.items() if k not in VOLATILE_CLAIMS}
+        tokens.append(json.dumps([analysis.header.get("alg"), claims], sort_keys=True, default=str))
+    raw = json.dumps({
+        "cookies": sorted(ctx.cookies),
+        "headers": sorted({k.lower() for k in ctx.headers}),
+        "tokens": sorted(tokens),
+    })
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class IncrementalScan:
+    """
+    Инкрементальный повторный скан цели.
+
+    Перед атаками каждый эндпоинт с безопасным методом запрашивается один раз,
+    и по ответу строится отпечаток. Задача (эндпоинт, контекст, атака) не выполняется,
+    если отпечаток эндпоинта совпал с прошлым сканом цели, форма контекста
+    и сигнатура атаки те же, а прошлый скан эту задачу выполнил, — её находки
+    переносятся из прошлого скана. После скана отпечатки и результаты задач
+    сохраняются как новая база для следующего раза.
+    """
+
+    def __init__(self, store: ScanStore, target: str, base_url: str):
+        self.store = store
+        self.target_key = f"{target} {base_url}"
+        self.fingerprints: Dict[str, Optional[str]] = {}
+        # ключ задачи в этом скане -> ключ в базе (без изменчивых значений контекста)
+        self._baseline_keys: Dict[str, str] = {}
+        # упавшие задачи: их "пустой" результат в базу не попадает, в следующий раз они выполнятся
+        self.failed: Set[str] = set()
+
+    async def probe(self, client: httpx.AsyncClient, endpoints: List[Endpoint], concurrency: int):
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(endpoint: Endpoint) -> Optional[str]:
+            if endpoint.method.upper() not in PROBE_METHODS:
+                return None
+            headers = {k: v for k, v in (endpoint.headers or {}).items() if k.lower() not in FORBIDDEN}
+            async with sem:
+                try:
+                    resp = await client.request(
+                        endpoint.method, endpoint.url, params=endpoint.params or None, headers=headers,
+                    )
+                except httpx.HTTPError:
+                    return None
+            return response_fingerprint(resp)
+
+        results = await asyncio.gather(*(one(ep) for ep in endpoints))
+        self.fingerprints = {endpoint_key(ep): fp for ep, fp in zip(endpoints, results)}
+
+    def _baseline_key(self, job: AttackJob, shapes: Dict[int, str]) -> str:
+        shape = shapes.get(id(job.ctx))
+        if shape is None:
+            shape = shapes[id(job.ctx)] = context_shape(job.ctx)
+        return f"{endpoint_key(job.endpoint)}|{shape}|{job.attack.signature()}"
+
+    def carry_over(self, plan: AttackPlan) -> Dict[str, List[AttackResult]]:
+        """
+        Убрать из плана задачи неизменившихся эндпоинтов.
+        Возвращает их находки из прошлого скана по ключам задач этого скана.
+        """
+        previous, previous_jobs = self.store.load_baseline(self.target_key)
+        unchanged = {
+            ep for ep, fp in self.fingerprints.items()
+            if fp is not None and previous.get(ep) == fp
+        }
+
+        shapes: Dict[int, str] = {}
+        carried: Dict[str, List[AttackResult]] = {}
+        remaining: List[AttackJob] = []
+        for job in plan.jobs:
+            bkey = self._baseline_key(job, shapes)
+            self._baseline_keys[job.key] = bkey
+            if endpoint_key(job.endpoint) in unchanged and bkey in previous_jobs:
+                carried[job.key] = previous_jobs[bkey]
+            else:
+                remaining.append(job)
+        plan.jobs = remaining
+
+        log.info(f"[INCREMENTAL] {len(unchanged)}/{len(self.fingerprints)} endpoints unchanged, "
+                 f"{len(carried)} jobs carried over, {len(remaining)} to run")
+        return carried
+
+    def mark_failed(self, key: str):
+        self.failed.add(key)
+
+    def save(self, scan_id: str):
+        """
+        Сохранить отпечатки и результаты задач этого скана как базу цели.
+        В базу идут только выполненные задачи; упавших в ней нет, и следующий
+        скан выполнит их заново, даже если эндпоинт не изменился.
+        """
+        done = self.store.completed_jobs(scan_id)
+        jobs = {
+            bkey: done[key] for key, bkey in self._baseline_keys.items()
+            if key in done and key not in self.failed
+        }
+        self.store.save_baseline(self.target_key, scan_id, self.fingerprints, jobs)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fuzzer.attacks.base import AttackResult
+from fuzzer.models import Endpoint, AuthContext
+
+DB_PATH = "scans.db"
+
+# выполненные задачи копятся и пишутся пачкой: при падении теряется не больше пачки
+FLUSH_EVERY = 50
+FLUSH_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id  TEXT PRIMARY KEY,
+    target   TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    options  TEXT NOT NULL,
+    status   TEXT NOT NULL,
+    started  REAL NOT NULL,
+    updated  REAL NOT NULL,
+    plan     TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    scan_id  TEXT NOT NULL,
+    job_key  TEXT NOT NULL,
+    issues   TEXT NOT NULL,
+    finished REAL NOT NULL,
+    PRIMARY KEY (scan_id, job_key)
+);
+CREATE TABLE IF NOT EXISTS job_progress (
+    scan_id  TEXT NOT NULL,
+    job_key  TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    issues   TEXT NOT NULL,
+    PRIMARY KEY (scan_id, job_key)
+);
+CREATE TABLE IF NOT EXISTS baselines (
+    target      TEXT NOT NULL,
+    endpoint    TEXT NOT NULL,
+    fingerprint TEXT,
+    scan_id     TEXT NOT NULL,
+    PRIMARY KEY (target, endpoint)
+);
+CREATE TABLE IF NOT EXISTS baseline_jobs (
+    target   TEXT NOT NULL,
+    job_key  TEXT NOT NULL,
+    issues   TEXT NOT NULL,
+    PRIMARY KEY (target, job_key)
+);
+"""
+
+
+class ScanStore:
+    """
+    Персистентное состояние сканов в SQLite: параметры скана, статус,
+    план (эндпоинты и контексты после разбора лога) и выполненные задачи
+    (endpoint, context, attack) вместе с находками. По этим данным прерванный
+    скан продолжается без повторной отправки уже выполненных задач.
+
+    Соединение одно на процесс и используется и из event loop, и из потоков
+    (синхронные обработчики API), поэтому всё обращение к нему — под блокировкой.
+    """
+
+    def __init__(self, path: str | Path = DB_PATH):
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        # reentrant: set_status и count_jobs сбрасывают буфер под той же блокировкой
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._progress: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._last_flush = time.monotonic()
+
+    # === сканы ===
+
+    def create_scan(self, scan_id: str, target: str, base_url: str, options: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO scans (scan_id, target, base_url, options, status, started, updated) "
+                "VALUES (?, ?, ?, ?, 'running', ?, ?) "
+                "ON CONFLICT(scan_id) DO UPDATE SET status = 'running', updated = excluded.updated",
+                (scan_id, target, base_url, json.dumps(options), now, now),
+            )
+
+    def set_status(self, scan_id: str, status: str):
+        with self._lock:
+            self.flush()
+            with self._db:
+                self._db.execute(
+                    "UPDATE scans SET status = ?, updated = ? WHERE scan_id = ?",
+                    (status, time.time(), scan_id),
+                )
+
+    def get_scan(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT scan_id, target, base_url, options, status, started, updated "
+                "FROM scans WHERE scan_id = ?",
+                (scan_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "scan_id": row[0],
+            "target": row[1],
+            "base_url": row[2],
+            "options": json.loads(row[3]),
+            "status": row[4],
+            "started": row[5],
+            "updated": row[6],
+            "jobs_done": self.count_jobs(scan_id),
+        }
+
+    # === план ===
+
+    def save_plan(self, scan_id: str, endpoints: List[Endpoint], contexts: List[AuthContext]):
+        plan = {
+            "endpoints": [ep.model_dump() for ep in endpoints],
+            "contexts": [c.model_dump() for c in contexts],
+        }
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE scans SET plan = ?, updated = ? WHERE scan_id = ?",
+                (json.dumps(plan, ensure_ascii=False), time.time(), scan_id),
+            )
+
+    def load_plan(self, scan_id: str) -> Optional[Tuple[List[Endpoint], List[AuthContext]]]:
+        with self._lock:
+            row = self._db.execute("SELECT plan FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        plan = json.loads(row[0])
+        return (
+            [Endpoint(**e) for e in plan["endpoints"]],
+            [AuthContext(**c) for c in plan["contexts"]],
+        )
+
+    # === задачи ===
+
+    def record_job(self, scan_id: str, job_key: str, results: List[AttackResult]):
+        row = (
+            scan_id,
+            job_key,
+            json.dumps([r.model_dump() for r in results], ensure_ascii=False),
+            time.time(),
+        )
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self.flush()
+
+    def save_progress(self, scan_id: str, job_key: str, position: int, results: List[AttackResult]):
+        """
+        Позиция долгой задачи (сколько payload'ов перебрано) и находки до неё.
+        Пишется вместе с выполненными задачами; для задачи хранится только последняя позиция.
+        """
+        issues = json.dumps([r.model_dump() for r in results], ensure_ascii=False)
+        with self._lock:
+            self._progress[(scan_id, job_key)] = (position, issues)
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self.flush()
+
+    def load_progress(self, scan_id: str, job_key: str) -> Tuple[int, List[AttackResult]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT position, issues FROM job_progress WHERE scan_id = ? AND job_key = ?",
+                (scan_id, job_key),
+            ).fetchone()
+        if row is None:
+            return 0, []
+        return row[0], [AttackResult(**r) for r in json.loads(row[1])]
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._progress:
+                return
+            rows, self._pending = self._pending, []
+            progress, self._progress = self._progress, {}
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO jobs (scan_id, job_key, issues, finished) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO job_progress (scan_id, job_key, position, issues) VALUES (?, ?, ?, ?)",
+                    [(scan_id, key, pos, issues) for (scan_id, key), (pos, issues) in progress.items()],
+                )
+
+    def completed_jobs(self, scan_id: str) -> Dict[str, List[AttackResult]]:
+        with self._lock:
+            self.flush()
+            rows = self._db.execute(
+                "SELECT job_key, issues FROM jobs WHERE scan_id = ?", (scan_id,)
+            ).fetchall()
+        return {key: [AttackResult(**r) for r in json.loads(issues)] for key, issues in rows}
+
+    def count_jobs(self, scan_id: str) -> int:
+        with self._lock:
+            self.flush()
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE scan_id = ?", (scan_id,)
+            ).fetchone()[0]
+
+    # === база для инкрементальных сканов ===
+
+    def load_baseline(self, target: str) -> Tuple[Dict[str, Optional[str]], Dict[str, List[AttackResult]]]:
+        """Отпечатки эндпоинтов и результаты задач последнего скана цели (см. fuzzer.incremental)."""
+        with self._lock:
+            fingerprints = dict(self._db.execute(
+                "SELECT endpoint, fingerprint FROM baselines WHERE target = ?", (target,)
+            ).fetchall())
+            rows = self._db.execute(
+                "SELECT job_key, issues FROM baseline_jobs WHERE target = ?", (target,)
+            ).fetchall()
+        jobs = {key: [AttackResult(**r) for r in json.loads(issues)] for key, issues in rows}
+        return fingerprints, jobs
+
+    def save_baseline(
+        self,
+        target: str,
+        scan_id: str,
+        fingerprints: Dict[str, Optional[str]],
+        jobs: Dict[str, List[AttackResult]],
+    ):
+        """Заменить базу цели целиком результатами скана scan_id."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM baselines WHERE target = ?", (target,))
+            self._db.execute("DELETE FROM baseline_jobs WHERE target = ?", (target,))
+            self._db.executemany(
+                "INSERT INTO baselines (target, endpoint, fingerprint, scan_id) VALUES (?, ?, ?, ?)",
+                [(target, ep, fp, scan_id) for ep, fp in fingerprints.items()],
+            )
+            self._db.executemany(
+                "INSERT INTO baseline_jobs (target, job_key, issues) VALUES (?, ?, ?)",
+                [
+                    (target, key, json.dumps([r.model_dump() for r in results], ensure_ascii=False))
+                    for key, results in jobs.items()
+                ],
+            )
+
+
+@lru_cache(maxsize=1)
+def get_store() -> ScanStore:
+    """Общее на процесс хранилище — создаётся при первом обращении."""
+    return ScanStore()
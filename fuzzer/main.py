@@ -1,39 +1,152 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+import os
 import uuid
-import time
 import asyncio
-from fuzzer.engine import run_scan
+from fuzzer.engine import scan_status
+from fuzzer.scan_queue import ScanQueue, DEFAULT_MAX_SCANS
+from fuzzer.job_store import get_store
+from fuzzer.report import read_issues
+from fuzzer.report_store import get_report_store
+from fuzzer import metrics
+from fuzzer.options import ScanOptions
+from fuzzer.attacks import ATTACKS
+from fuzzer.runners import RUNNERS
 
 app = FastAPI()
-scans = {}  # in-memory
 
-class StartScan(BaseModel):
+# сканы выполняются по очереди: не больше FUZZER_MAX_SCANS одновременно
+scan_queue = ScanQueue(int(os.environ.get("FUZZER_MAX_SCANS", DEFAULT_MAX_SCANS)))
+
+class StartScan(ScanOptions):
     target: str
     base_url: str
+    # больший приоритет — раньше в очереди
+    priority: int = 0
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scan_queue.aclose()
 
 @app.post("/scan/start")
 async def start_scan(req: StartScan):
+    # имена проверяются по реестрам без импорта самих плагинов
+    if req.target not in RUNNERS:
+        raise HTTPException(422, f"unknown target: {req.target}")
+    unknown = [name for name in req.attacks if name not in ATTACKS]
+    if unknown:
+        raise HTTPException(422, f"unknown attacks: {', '.join(unknown)}")
+
     scan_id = str(uuid.uuid4())
 
-    scans[scan_id] = {"status": "running", "started": time.time()}
+    position = scan_queue.submit(
+        scan_id,
+        req.target,
+        req.base_url,
+        ScanOptions(**req.model_dump(exclude={"target", "base_url", "priority"})),
+        priority=req.priority,
+    )
 
-    asyncio.create_task(
-        run_scan(scan_id, req.target, req.base_url)
+    return {"scan_id": scan_id, "status": "queued", "position": position}
+
+@app.post("/scan/{scan_id}/resume")
+async def resume_scan(scan_id: str, priority: int = 0):
+    saved = get_store().get_scan(scan_id)
+    if saved is None:
+        raise HTTPException(404)
+    if saved["status"] == "finished":
+        raise HTTPException(409, "scan already finished")
+    if scan_queue.is_active(scan_id):
+        raise HTTPException(409, "scan is queued or running")
+
+    position = scan_queue.submit(
+        scan_id,
+        saved["target"],
+        saved["base_url"],
+        ScanOptions(**saved["options"]),
+        priority=priority,
+        resume=True,
     )
 
-    return {"scan_id": scan_id, "status": "started"}
+    return {"scan_id": scan_id, "status": "queued", "position": position, "jobs_done": saved["jobs_done"]}
+
+@app.post("/scan/{scan_id}/cancel")
+async def cancel_scan(scan_id: str):
+    result = scan_queue.cancel(scan_id)
+    if result is None:
+        if scan_id in scan_status or get_store().get_scan(scan_id) is not None:
+            raise HTTPException(409, "scan is not queued or running")
+        raise HTTPException(404)
+    return {"scan_id": scan_id, "status": result}
 
 @app.get("/scan/{scan_id}/status")
 def status(scan_id: str):
-    if scan_id not in scans:
-        raise HTTPException(404)
-    return scans[scan_id]
+    live = scan_status.get(scan_id)
+    if live is None:
+        # скан из прошлого запуска сервиса — состояние есть только в хранилище
+        saved = get_store().get_scan(scan_id)
+        if saved is None:
+            raise HTTPException(404)
+        return saved
+    result = {"scan_id": scan_id, **live}
+    position = scan_queue.position(scan_id)
+    if position is not None:
+        result["position"] = position
+    return result
 
 @app.get("/scan/{scan_id}/report")
-def report(scan_id: str):
-    import os, json
-    p = f"reports/{scan_id}.json"
-    if not os.path.exists(p):
+async def report(scan_id: str, request: Request):
+    store = get_report_store()
+    # клиент с актуальной копией получает 304, файл отчёта не открывается
+    etag = await asyncio.to_thread(store.etag, scan_id)
+    if etag is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    found = await asyncio.to_thread(store.get, scan_id)
+    if found is None:
         raise HTTPException(404)
-    return json.load(open(p))
+    etag, data = found
+    return JSONResponse(data, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/reports")
+async def reports(
+    target: Optional[str] = None,
+    severity: Optional[str] = None,
+    since: Optional[float] = None,
+    offset: int = 0,
+    limit: int = 100,
+):
+    """Готовые отчёты из индекса, новые первыми; severity — только сканы с такими находками."""
+    items = await asyncio.to_thread(
+        get_report_store().query, target, severity, since, offset, min(limit, 1000)
+    )
+    return {"offset": offset, "items": items}
+
+@app.get("/reports/stats")
+async def reports_stats(target: Optional[str] = None):
+    """Число сканов и находок по severity для каждой цели."""
+    return await asyncio.to_thread(get_report_store().stats, target)
+
+@app.get("/scan/{scan_id}/issues")
+async def issues(scan_id: str, offset: int = 0, limit: int = 100):
+    """Находки постранично — доступны и пока скан ещё идёт."""
+    items = await asyncio.to_thread(read_issues, scan_id, offset, min(limit, 1000))
+    live = scan_status.get(scan_id, {})
+    return {
+        "scan_id": scan_id,
+        "status": live.get("status"),
+        "offset": offset,
+        "items": items,
+        "found_so_far": live.get("issues"),
+    }
+
+@app.get("/plugins")
+def plugins():
+    """Доступные цели и атаки (для поля attacks в /scan/start)."""
+    return {"targets": RUNNERS.names(), "attacks": ATTACKS.names()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Tuple
+
+import httpx
+
+# атака, от имени которой сейчас идут запросы (ставит планировщик на время attack.run)
+current_attack: ContextVar[str] = ContextVar("fuzzer_current_attack", default="")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, value: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + value
+
+    def render(self) -> Iterator[str]:
+        # снимок: /metrics рендерится в потоке, пока event loop дописывает ряды
+        for lv, v in list(self.values.items()):
+            yield f"{self.name}{_fmt_labels(self.labels, lv)} {v}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: Labels, value: float):
+        self.values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(buckets)
+        # по каждому набору меток: счётчики корзин (не кумулятивные), сумма, количество
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            self.values[labels] = entry
+        counts, sums = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        sums[0] += value
+        sums[1] += 1
+
+    def render(self) -> Iterator[str]:
+        for lv, (counts, (total, n)) in list(self.values.items()):
+            acc = 0
+            for bound, c in zip(self.buckets, counts):
+                acc += c
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_fmt_labels(self.labels, lv, le)} {acc}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_fmt_labels(self.labels, lv, le)} {int(n)}"
+            yield f"{self.name}_sum{_fmt_labels(self.labels, lv)} {total}"
+            yield f"{self.name}_count{_fmt_labels(self.labels, lv)} {int(n)}"
+
+
+HTTP_REQUESTS = Counter(
+    "fuzzer_http_requests_total", "HTTP requests sent to targets",
+    ("scan", "attack", "host", "code"),
+)
+HTTP_ERRORS = Counter(
+    "fuzzer_http_errors_total", "HTTP requests that failed without a response",
+    ("scan", "attack", "host", "error"),
+)
+HTTP_LATENCY = Histogram(
+    "fuzzer_http_request_duration_seconds", "HTTP request latency",
+    ("scan", "attack", "host"),
+)
+ATTACK_JOBS = Counter(
+    "fuzzer_attack_jobs_total", "Attack jobs by outcome (ok, error, skipped)",
+    ("scan", "attack", "outcome"),
+)
+ATTACK_LATENCY = Histogram(
+    "fuzzer_attack_duration_seconds", "Time spent in AttackStrategy.run per job",
+    ("scan", "attack"),
+)
+PHASE_SECONDS = Gauge(
+    "fuzzer_phase_seconds", "Wall time per scan phase (runner, parse, attack)",
+    ("scan", "phase"),
+)
+HOST_RATE_LIMIT = Gauge(
+    "fuzzer_host_rate_limit", "Current AIMD limit of concurrent attack requests per host",
+    ("scan", "host"),
+)
+
+REGISTRY = [HTTP_REQUESTS, HTTP_ERRORS, HTTP_LATENCY, ATTACK_JOBS, ATTACK_LATENCY, PHASE_SECONDS, HOST_RATE_LIMIT]
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for m in REGISTRY:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+def forget_scan(scan_id: str):
+    """
+    Убрать ряды скана (метка scan) из всех метрик. Вызывается, когда скан завершён
+    или отменён, — иначе на долгоживущем сервисе /metrics и память растут с каждым сканом.
+    """
+    for m in REGISTRY:
+        i = m.labels.index("scan")
+        for lv in [lv for lv in list(m.values) if lv[i] == scan_id]:
+            m.values.pop(lv, None)
+
+
+@contextmanager
+def phase_timer(scan_id: str, phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.set((scan_id, phase), time.perf_counter() - start)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Транспорт-обёртка: счётчики, ошибки и латентность каждого запроса по скану, атаке и хосту."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, scan_id: str):
+        self.inner = inner
+        self.scan_id = scan_id
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attack = current_attack.get()
+        host = request.url.netloc.decode("ascii", "replace")
+        start = time.perf_counter()
+        try:
+            resp = await self.inner.handle_async_request(request)
+        except Exception as exc:
+            HTTP_ERRORS.inc((self.scan_id, attack, host, type(exc).__name__))
+            raise
+        finally:
+            HTTP_LATENCY.observe((self.scan_id, attack, host), time.perf_counter() - start)
+        HTTP_REQUESTS.inc((self.scan_id, attack, host, str(resp.status_code)))
+        return resp
+
+    async def aclose(self):
+        await self.inner.aclose()
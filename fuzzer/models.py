@@ -11,6 +11,13 @@ class Endpoint(BaseModel):
     has_auth_header: bool
     body: Optional[Any] = None
     headers: Dict[str, str] = {}
+    # шаблон пути (/rest/products/{id}), если эндпоинт прошёл свёртку
+    template: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return self.base_url.rstrip("/") + self.path
+
 class AuthContext(BaseModel):
     cookies: Dict[str, str]
     headers: Dict[str, str]
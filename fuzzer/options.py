@@ -0,0 +1,40 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from fuzzer.bounded_reads import DEFAULT_MAX_BODY
+from fuzzer.http_client import ClientSettings
+from fuzzer.rate_control import RateSettings
+from fuzzer.scheduler import DEFAULT_CONCURRENCY, DEFAULT_PER_HOST
+from fuzzer.templating import DEFAULT_REPRESENTATIVES
+from fuzzer.wordlists import DEFAULT_BATCH
+
+
+class ScanOptions(BaseModel):
+    """Параметры выполнения скана (всё, кроме цели)."""
+    concurrency: int = DEFAULT_CONCURRENCY
+    per_host: int = DEFAULT_PER_HOST
+    pipelined: bool = False
+    dedupe_requests: bool = True
+    direct: bool = False
+    record_sample: float = 0.0
+    http: ClientSettings = ClientSettings()
+    # адаптивный лимит запросов атак на хост (AIMD)
+    rate: RateSettings = RateSettings()
+    workers: int = 1
+    checkpoint: bool = True
+    # повторный скан: атаковать только эндпоинты, чей ответ изменился с прошлого скана цели
+    incremental: bool = False
+    # сколько конкретных эндпоинтов атаковать на один шаблон пути (0 — без свёртки)
+    path_representatives: int = DEFAULT_REPRESENTATIVES
+    # сколько байт тела ответа читать в атаках (0 — читать целиком)
+    max_response_bytes: int = DEFAULT_MAX_BODY
+    # дочитывать тело до конца ради sha256 всего ответа
+    hash_responses: bool = False
+    # словари для payload_injection (SecLists и т.п.); пусто — атака не включается
+    wordlists: List[str] = []
+    payload_batch: int = DEFAULT_BATCH
+    # сколько payload'ов брать на задачу (0 — все)
+    payload_limit: int = 0
+    # какие атаки запускать (имена из fuzzer.attacks.ATTACKS); пусто — все доступные
+    attacks: List[str] = []
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Dict, List, Optional
+
+from fuzzer.attacks.base import AttackStrategy
+from fuzzer.models import Endpoint, AuthContext
+from fuzzer.planner import build_plan
+from fuzzer.runners.storage import ProxyLogParser
+from fuzzer.scheduler import AttackScheduler
+from fuzzer.templating import DEFAULT_REPRESENTATIVES, endpoint_template_key
+
+log = logging.getLogger("fuzzer")
+
+POLL_INTERVAL = 0.2
+
+
+async def tail_lines(
+    log_path: str | Path,
+    stop: asyncio.Event,
+    poll_interval: float = POLL_INTERVAL,
+) -> AsyncIterator[str]:
+    """
+    Читает новые строки из файла по мере дозаписи (как tail -f).
+    Файл читается в байтах, и декодируются только целые строки: неполная последняя
+    строка (в том числе оборванная посреди многобайтового символа UTF-8)
+    придерживается до появления перевода строки.
+    Ротация Recorder'а (файл переименован, на его месте новый) не теряет строк:
+    открытый файл дочитывается до конца, и только потом открывается новый.
+    После stop файл дочитывается до конца и генератор завершается.
+    """
+    log_path = Path(log_path)
+    f = None
+    pending = b""
+
+    try:
+        while True:
+            stopping = stop.is_set()
+
+            if f is None:
+                try:
+                    f = log_path.open("rb")
+                except FileNotFoundError:
+                    pass
+
+            while f is not None:
+                if os.fstat(f.fileno()).st_size < f.tell():
+                    # файл обрезан на месте — читаем заново
+                    f.seek(0)
+                    pending = b""
+                chunk = f.read()
+                if chunk:
+                    pending += chunk
+                    *lines, pending = pending.split(b"\n")
+                    for line in lines:
+                        yield line.decode("utf-8", "replace")
+
+                # на месте файла новый сегмент — старый дочитан, переходим на новый
+                try:
+                    rotated = os.stat(log_path).st_ino != os.fstat(f.fileno()).st_ino
+                except FileNotFoundError:
+                    # старый уже переименован, новый ещё не создан — ждём его
+                    rotated = False
+                if not rotated:
+                    break
+                f.close()
+                f = None
+                if pending:
+                    yield pending.decode("utf-8", "replace")
+                    pending = b""
+                try:
+                    f = log_path.open("rb")
+                except FileNotFoundError:
+                    pass
+
+            if stopping:
+                if pending:
+                    yield pending.decode("utf-8", "replace")
+                return
+
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if f is not None:
+            f.close()
+
+
+@dataclass
+class _Submitted:
+    """Что уже отправлено в атаку для эндпоинта."""
+    tokens: set = field(default_factory=set)
+    cookies: Dict[str, str] = field(default_factory=dict)
+    has_auth_header: bool = False
+    has_auth_cookie: bool = False
+    template: Optional[str] = None
+
+
+class CrawlPipeline:
+    """
+    Конвейер "разведка → атака": пока runner гоняет сценарий, лог прокси
+    читается хвостом, и каждый новый эндпоинт сразу уходит в планировщик.
+
+    Контекст авторизации растёт по ходу сценария (токен появляется после логина),
+    поэтому после окончания сценария эндпоинты, атакованные с устаревшим
+    контекстом, досылаются с дельтой: если добавились только токены, повторно
+    планируются лишь атаки per_token и только с ещё не опробованными токенами;
+    остальные атаки с тем же контекстом второй раз не запускаются.
+
+    Эндпоинты сворачиваются по шаблону пути: атакуются первые representatives
+    конкретных путей каждого шаблона (см. fuzzer.templating).
+    """
+
+    def __init__(
+        self,
+        scan_id: str,
+        scheduler: AttackScheduler,
+        attacks: List[AttackStrategy],
+        log_path: str | Path = "proxy_log.jsonl",
+        representatives: int = DEFAULT_REPRESENTATIVES,
+    ):
+        self.scan_id = scan_id
+        self.scheduler = scheduler
+        self.attacks = attacks
+        self.log_path = log_path
+        self.parser = ProxyLogParser()
+        self.representatives = representatives
+        self._submitted: Dict[tuple, _Submitted] = {}
+        self._per_template: Dict[tuple, int] = {}
+
+    async def run(self, runner: Awaitable):
+        stop = asyncio.Event()
+        consumer = asyncio.create_task(self._consume(stop))
+
+        try:
+            await runner
+        finally:
+            stop.set()
+            await consumer
+
+        # сценарий закончился — досылаем эндпоинты, увидевшие неполный контекст
+        ctx = self.parser.context()
+        for ep in self.parser.endpoints():
+            seen = self._submitted.get(self._key(ep))
+            if seen is not None:
+                # endpoints() отдаёт свежие модели — шаблон берём из первой отправки
+                ep.template = seen.template
+                self._submit(ep, ctx)
+
+        log.info(f"[SCAN {self.scan_id}] Crawl finished: "
+                 f"{len(self.parser.endpoints_map)} endpoints, "
+                 f"{self.scheduler.total} tasks queued")
+
+    async def _consume(self, stop: asyncio.Event):
+        async for line in tail_lines(self.log_path, stop):
+            ep = self.parser.feed_line(line)
+            if ep is not None and self._take_representative(ep):
+                self._submit(ep, self.parser.context())
+
+    def _take_representative(self, ep: Endpoint) -> bool:
+        if self.representatives <= 0:
+            return True
+        tkey = endpoint_template_key(ep)
+        taken = self._per_template.get(tkey, 0)
+        if taken >= self.representatives:
+            return False
+        self._per_template[tkey] = taken + 1
+        ep.template = tkey[2]
+        return True
+
+    @staticmethod
+    def _key(ep: Endpoint) -> tuple:
+        return ep.method, ep.base_url, ep.path
+
+    def _submit(self, ep: Endpoint, ctx: AuthContext):
+        key = self._key(ep)
+        seen = self._submitted.get(key)
+
+        # (контекст, атаки) для досылки
+        batches = [(ctx, self.attacks)]
+        if seen is not None:
+            flags_changed = (
+                seen.has_auth_header != ep.has_auth_header
+                or seen.has_auth_cookie != ep.has_auth_cookie
+            )
+            new_tokens = [t for t in ctx.jwt_tokens if t not in seen.tokens]
+            cookies_changed = seen.cookies != ctx.cookies
+            if not flags_changed and not new_tokens and not cookies_changed:
+                return
+            if not flags_changed:
+                # эндпоинт тот же: атаки per_token — с новыми токенами,
+                # остальные — только если сменились cookie
+                per_token = [a for a in self.attacks if a.per_token]
+                batches = []
+                if new_tokens and per_token:
+                    batches.append((ctx.model_copy(update={"jwt_tokens": new_tokens}), per_token))
+                if cookies_changed:
+                    batches.append((ctx, [a for a in self.attacks if not a.per_token]))
+
+        self._submitted[key] = _Submitted(
+            tokens=set(ctx.jwt_tokens),
+            cookies=dict(ctx.cookies),
+            has_auth_header=ep.has_auth_header,
+            has_auth_cookie=ep.has_auth_cookie,
+            template=ep.template,
+        )
+
+        for job_ctx, attacks in batches:
+            for job in build_plan([ep], [job_ctx], attacks, scan_id=self.scan_id):
+                self.scheduler.submit(job)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import AbstractSet, Dict, Iterable, List
+
+from fuzzer.attacks.base import AttackStrategy
+from fuzzer.metrics import ATTACK_JOBS
+from fuzzer.models import Endpoint, AuthContext
+from fuzzer.scheduler import AttackJob
+
+
+def context_digest(ctx: AuthContext) -> str:
+    raw = json.dumps(ctx.model_dump(), sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def job_key(endpoint: Endpoint, ctx_digest: str, attack_name: str) -> str:
+    return f"{endpoint.method} {endpoint.url}|{ctx_digest}|{attack_name}"
+
+
+@dataclass
+class AttackPlan:
+    """Явный упорядоченный список задач: размер известен заранее и точен."""
+    jobs: List[AttackJob] = field(default_factory=list)
+    # сколько сочетаний отброшено как неприменимые, по атакам
+    not_applicable: Dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.jobs)
+
+
+def build_plan(
+    endpoints: Iterable[Endpoint],
+    contexts: List[AuthContext],
+    attacks: List[AttackStrategy],
+    skip: AbstractSet[str] = frozenset(),
+    scan_id: str = "",
+) -> AttackPlan:
+    """
+    Построить план endpoint × context × attack.
+
+    Предикаты применимости, зависящие только от контекста или только от эндпоинта,
+    считаются по одному разу и складываются в индексы; для атак с совместным
+    applicable() проверяется каждая пара. В план попадают только применимые задачи,
+    кроме уже выполненных (skip — ключи задач). Порядок — по эндпоинтам, чтобы
+    задачи одного эндпоинта шли рядом (на этом держится схлопывание запросов).
+    """
+    endpoints = list(endpoints)
+    digests = [context_digest(ctx) for ctx in contexts]
+    plan = AttackPlan(not_applicable={a.name: 0 for a in attacks})
+
+    # индексы: для каждой атаки — флаги по контекстам и по эндпоинтам
+    precomputed = [a.precomputable() for a in attacks]
+    ctx_ok = [
+        [a.context_applicable(ctx) for ctx in contexts] if pre else None
+        for a, pre in zip(attacks, precomputed)
+    ]
+    ep_ok = [
+        [a.endpoint_applicable(ep) for ep in endpoints] if pre else None
+        for a, pre in zip(attacks, precomputed)
+    ]
+
+    for ei, ep in enumerate(endpoints):
+        for ci, (ctx, digest) in enumerate(zip(contexts, digests)):
+            for ai, attack in enumerate(attacks):
+                if precomputed[ai]:
+                    ok = ctx_ok[ai][ci] and ep_ok[ai][ei]
+                else:
+                    ok = attack.applicable(ep, ctx)
+                if not ok:
+                    plan.not_applicable[attack.name] += 1
+                    continue
+
+                key = job_key(ep, digest, attack.name)
+                if key not in skip:
+                    plan.jobs.append(AttackJob(ep, ctx, attack, key))
+
+    for name, count in plan.not_applicable.items():
+        if count:
+            ATTACK_JOBS.inc((scan_id, name, "skipped"), count)
+
+    return plan
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import importlib
+import logging
+from collections.abc import MutableMapping
+from importlib.metadata import EntryPoint, entry_points
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+log = logging.getLogger("fuzzer")
+
+# группы entry points для сторонних пакетов:
+#   [project.entry-points."pyfuzzer.attacks"]  my-attack = "my_pkg.attacks:MyAttack"
+#   [project.entry-points."pyfuzzer.runners"]  my-target = "my_pkg.runners:run_my_target"
+ATTACKS_GROUP = "pyfuzzer.attacks"
+RUNNERS_GROUP = "pyfuzzer.runners"
+
+Spec = Union[str, EntryPoint]
+
+
+def _load(spec: Spec) -> Any:
+    if isinstance(spec, EntryPoint):
+        return spec.load()
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+class PluginRegistry(MutableMapping):
+    """
+    Реестр плагинов (атак или runner'ов) с ленивым импортом.
+
+    Имена известны без импорта: встроенный манифест "имя -> модуль:объект",
+    entry points группы group и то, что вернёт discover (он вызывается один раз,
+    при первом обращении к реестру). Модуль плагина импортируется только тогда,
+    когда плагин впервые запрошен по имени. При совпадении имён побеждает более
+    поздний источник: манифест, entry points, discover, явная регистрация (reg[name] = obj).
+    """
+
+    def __init__(
+        self,
+        group: str,
+        builtins: Dict[str, str],
+        discover: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        self.group = group
+        self._builtins = dict(builtins)
+        self._discover = discover
+        self._specs: Optional[Dict[str, Spec]] = None
+        self._loaded: Dict[str, Any] = {}
+
+    def _index(self) -> Dict[str, Spec]:
+        if self._specs is None:
+            specs: Dict[str, Spec] = dict(self._builtins)
+            for ep in entry_points(group=self.group):
+                specs[ep.name] = ep
+            if self._discover is not None:
+                for name, obj in self._discover().items():
+                    specs[name] = name
+                    self._loaded[name] = obj
+            self._specs = specs
+        return self._specs
+
+    def names(self) -> List[str]:
+        """Имена всех плагинов; ничего не импортирует."""
+        return list(self._index())
+
+    def __getitem__(self, name: str) -> Any:
+        specs = self._index()
+        if name in self._loaded:
+            return self._loaded[name]
+        if name not in specs:
+            raise KeyError(name)
+        obj = _load(specs[name])
+        self._loaded[name] = obj
+        return obj
+
+    def __setitem__(self, name: str, obj: Any):
+        self._index()[name] = name
+        self._loaded[name] = obj
+
+    def __delitem__(self, name: str):
+        del self._index()[name]
+        self._loaded.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index()
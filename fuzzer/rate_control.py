@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from fuzzer.metrics import HOST_RATE_LIMIT
+
+
+class RateSettings(BaseModel):
+    """Параметры AIMD-регулятора: лимит одновременных запросов атак на хост."""
+    enabled: bool = True
+    initial: int = 8
+    min_limit: int = 1
+    max_limit: int = 64
+    # +increase к лимиту за окно успешных ответов со стабильной латентностью
+    increase: float = 1.0
+    # лимит умножается на decrease при 429/5xx, таймаутах и росте p95
+    decrease: float = 0.5
+    # размер окна (ответов), по которому считается p95
+    window: int = 20
+    # p95 окна выше лучшего p95 во столько раз — цель перегружена
+    latency_tolerance: float = 2.0
+
+
+def _p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class HostLimiter:
+    """
+    Адаптивный лимит одновременных запросов на один хост (AIMD):
+    аддитивный рост, пока латентность стабильна, мультипликативный спад при перегрузке.
+    Спад не чаще раза в окно, чтобы пачка ошибок от уже отправленных запросов
+    не обрушила лимит до минимума. Растёт лимит, только если за окно он хоть раз
+    был выбран целиком: иначе узкое место не он, и рост ничего не проверяет.
+    ceiling — потолок сверх settings.max_limit (реальная параллельность на хост).
+    """
+
+    def __init__(self, settings: RateSettings, ceiling: Optional[int] = None):
+        self.settings = settings
+        top = settings.max_limit if ceiling is None else min(settings.max_limit, ceiling)
+        self.max_limit = max(settings.min_limit, top)
+        self.limit = float(max(settings.min_limit, min(settings.initial, self.max_limit)))
+        self.inflight = 0
+        self.baseline: Optional[float] = None
+        # лимит был выбран целиком в текущем окне
+        self._saturated = False
+
+        self._cond = asyncio.Condition()
+        self._window: Deque[float] = deque(maxlen=max(1, settings.window))
+        # первый сигнал перегрузки снижает лимит сразу
+        self._since_decrease = self._window.maxlen
+
+    @property
+    def current(self) -> int:
+        return max(1, int(self.limit))
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.inflight < self.current)
+            self.inflight += 1
+            if self.inflight >= self.current:
+                self._saturated = True
+
+    async def release(self):
+        async with self._cond:
+            self.inflight -= 1
+            self._cond.notify(max(1, self.current - self.inflight))
+
+    def observe(self, latency: float, overloaded: bool) -> bool:
+        """Учесть результат запроса. Возвращает True, если лимит изменился."""
+        s = self.settings
+        self._since_decrease += 1
+        if overloaded:
+            return self._decrease()
+
+        self._window.append(latency)
+        if len(self._window) < self._window.maxlen:
+            return False
+
+        p95 = _p95(self._window)
+        self._window.clear()
+        saturated, self._saturated = self._saturated, self.inflight >= self.current
+        if self.baseline is None or p95 < self.baseline:
+            self.baseline = p95
+        if p95 > self.baseline * s.latency_tolerance:
+            return self._decrease()
+        if not saturated:
+            return False
+
+        before = self.current
+        self.limit = min(float(self.max_limit), self.limit + s.increase)
+        return self.current != before
+
+    def _decrease(self) -> bool:
+        s = self.settings
+        if self._since_decrease < self._window.maxlen:
+            return False
+        self._since_decrease = 0
+        self._window.clear()
+        before = self.current
+        self.limit = max(float(s.min_limit), self.limit * s.decrease)
+        return self.current != before
+
+
+class RateController:
+    """
+    Регуляторы по хостам одного скана; on_change получает снимок лимитов {host: лимит}.
+    ceiling — сколько запросов на хост клиент вообще может держать одновременно
+    (per_host планировщика): лимит выше него ничего не значит.
+    """
+
+    def __init__(
+        self,
+        settings: RateSettings,
+        scan_id: str = "",
+        on_change: Optional[Callable[[Dict[str, int]], None]] = None,
+        ceiling: Optional[int] = None,
+    ):
+        self.settings = settings
+        self.scan_id = scan_id
+        self.on_change = on_change
+        self.ceiling = ceiling
+        self._hosts: Dict[str, HostLimiter] = {}
+
+    def limiter(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = HostLimiter(self.settings, self.ceiling)
+            self._hosts[host] = limiter
+            self._changed(host)
+        return limiter
+
+    def limits(self) -> Dict[str, int]:
+        return {host: lim.current for host, lim in self._hosts.items()}
+
+    def observe(self, host: str, latency: float, overloaded: bool):
+        if self._hosts[host].observe(latency, overloaded):
+            self._changed(host)
+
+    def _changed(self, host: str):
+        HOST_RATE_LIMIT.set((self.scan_id, host), self._hosts[host].current)
+        if self.on_change is not None:
+            self.on_change(self.limits())
+
+
+class RateControlledTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт-обёртка с AIMD-лимитом на хост. Слот занят до получения заголовков ответа.
+    Внутренний транспорт (общий пул скана) не закрывается — им владеет ClientFactory.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, controller: RateController):
+        self.inner = inner
+        self.controller = controller
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.netloc.decode("ascii", "replace")
+        limiter = self.controller.limiter(host)
+
+        await limiter.acquire()
+        start = time.perf_counter()
+        try:
+            resp = await self.inner.handle_async_request(request)
+        except httpx.TimeoutException:
+            self.controller.observe(host, time.perf_counter() - start, overloaded=True)
+            raise
+        finally:
+            await asyncio.shield(limiter.release())
+
+        overloaded = resp.status_code == 429 or resp.status_code >= 500
+        self.controller.observe(host, time.perf_counter() - start, overloaded)
+        return resp
+
+    async def aclose(self):
+        pass
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import httpx
+
+ATTACK_LOG_FILE = "attack_log.jsonl"
+
+
+class AttackTrafficRecorder:
+    """
+    Выборочная запись трафика атак в прямом режиме (мимо mitmproxy).
+    Формат записей совпадает с proxy/addon.py, но пишется в отдельный файл,
+    чтобы не засорять proxy_log.jsonl, из которого строится разведка.
+    Подключается как response-hook httpx-клиента.
+    """
+
+    def __init__(self, scan_id: str, sample_rate: float, log_path: str | Path = ATTACK_LOG_FILE):
+        self.scan_id = scan_id
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.recorded = 0
+        self._f = open(log_path, "a", encoding="utf-8")
+
+    async def on_response(self, resp: httpx.Response):
+        if random.random() >= self.sample_rate:
+            return
+
+        req = resp.request
+        entry = {
+            "t": time.time(),
+            "stage": "response",
+            "scan_id": self.scan_id,
+            "method": req.method,
+            "scheme": req.url.scheme,
+            "host": req.url.host,
+            "port": req.url.port,
+            "path": req.url.path,
+            "query": parse_qs(req.url.query.decode("ascii", "replace")),
+            "req_headers": dict(req.headers),
+            "status": resp.status_code,
+            "resp_headers": dict(resp.headers),
+        }
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.recorded += 1
+
+    def close(self):
+        self._f.close()
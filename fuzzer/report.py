@@ -1,5 +1,35 @@
+import gzip
 import json
+import queue
+import threading
 import time
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+REPORTS_DIR = "reports"
+
+# как часто поток записи сбрасывает находки на диск (их читает API, пока скан идёт)
+SINK_FLUSH_INTERVAL = 0.5
+
+
+# итоговые отчёты сжимаются: JSON находок хорошо жмётся, а читается целиком и редко
+REPORT_COMPRESSLEVEL = 6
+
+
+def report_path(scan_id: str) -> Path:
+    return Path(REPORTS_DIR) / f"{scan_id}.json.gz"
+
+
+def legacy_report_path(scan_id: str) -> Path:
+    """Несжатый отчёт: так писались отчёты раньше, так пишет write_report."""
+    return Path(REPORTS_DIR) / f"{scan_id}.json"
+
+
+def issues_path(scan_id: str) -> Path:
+    return Path(REPORTS_DIR) / f"{scan_id}.issues.jsonl"
+
 
 def write_report(scan_id: str, target: str, base_url: str, issues: list):
     report = {
@@ -11,5 +41,115 @@ def write_report(scan_id: str, target: str, base_url: str, issues: list):
         "total": len(issues),
     }
 
-    with open(f"reports/{scan_id}.json", "w", encoding="utf-8") as f:
+    with open(legacy_report_path(scan_id), "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+class IssueSink:
+    """
+    Потоковая запись находок скана в reports/<scan_id>.issues.jsonl (NDJSON).
+    Сериализация и запись — в фоновом потоке, event loop только кладёт в очередь.
+    Сводка (всего, по severity, по типу уязвимости) считается на лету.
+    """
+
+    def __init__(self, scan_id: str):
+        self.scan_id = scan_id
+        self.path = issues_path(scan_id)
+        self.total = 0
+        self.by_severity: Counter = Counter()
+        self.by_vulnerability: Counter = Counter()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._stop = object()
+        # файл открывается здесь, чтобы при продолжении скана старые находки затирались сразу
+        self._f = open(self.path, "w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name=f"issue-sink-{scan_id}", daemon=True)
+        self._thread.start()
+
+    def put_many(self, results: Iterable):
+        for r in results:
+            self.total += 1
+            self.by_severity[r.severity] += 1
+            self.by_vulnerability[r.vulnerability] += 1
+            self._queue.put(r)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "by_severity": dict(self.by_severity),
+            "by_vulnerability": dict(self.by_vulnerability),
+        }
+
+    def close(self):
+        self._queue.put(self._stop)
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + SINK_FLUSH_INTERVAL
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is self._stop:
+                break
+            if item is not None:
+                self._f.write(json.dumps(item.model_dump(), ensure_ascii=False) + "\n")
+
+            if time.monotonic() >= deadline:
+                self._f.flush()
+                deadline = time.monotonic() + SINK_FLUSH_INTERVAL
+
+        self._f.close()
+
+
+def finalize_report(scan_id: str, target: str, base_url: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Собрать reports/<scan_id>.json.gz из NDJSON-файла находок построчно,
+    не поднимая все находки в память. Формат JSON совместим с write_report.
+    Возвращает заголовок отчёта (всё, кроме находок) — для индекса.
+    Блокирующая функция — из event loop вызывать через asyncio.to_thread.
+    """
+    head = {
+        "scan_id": scan_id,
+        "target": target,
+        "base_url": base_url,
+        "generated": time.time(),
+    }
+    tmp = report_path(scan_id).with_suffix(".tmp")
+
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=REPORT_COMPRESSLEVEL) as out:
+        out.write(json.dumps(head, ensure_ascii=False)[:-1])
+        out.write(', "issues": [')
+        first = True
+        src = issues_path(scan_id)
+        if src.exists():
+            with open(src, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    out.write("\n  " if first else ",\n  ")
+                    out.write(line)
+                    first = False
+        out.write("\n]")
+        out.write(f', "total": {summary["total"]}')
+        out.write(f', "summary": {json.dumps(summary, ensure_ascii=False)}}}\n')
+
+    tmp.replace(report_path(scan_id))
+    # при продолжении старого скана рядом мог остаться несжатый отчёт
+    legacy_report_path(scan_id).unlink(missing_ok=True)
+    return {**head, "total": summary["total"], "summary": summary}
+
+
+def read_issues(scan_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    """Страница находок из NDJSON-файла — доступна и пока скан ещё идёт."""
+    src = issues_path(scan_id)
+    if not src.exists():
+        return []
+    with open(src, encoding="utf-8") as f:
+        # последняя строка может быть дописана не полностью — такие пропускаем
+        lines = islice(f, offset, offset + limit)
+        return [json.loads(line) for line in lines if line.endswith("\n")]
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fuzzer.report import REPORTS_DIR, finalize_report, legacy_report_path, report_path
+
+INDEX_NAME = "index.db"
+
+# сколько разобранных отчётов держать в памяти
+DEFAULT_CACHE_SIZE = 32
+# отчёты больше этого числа находок не кэшируются — один такой вытеснил бы весь кэш
+CACHE_MAX_ISSUES = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    scan_id   TEXT PRIMARY KEY,
+    target    TEXT NOT NULL,
+    base_url  TEXT NOT NULL,
+    generated REAL NOT NULL,
+    total     INTEGER NOT NULL,
+    summary   TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    etag      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_by_target ON reports (target, generated);
+CREATE TABLE IF NOT EXISTS report_counts (
+    scan_id  TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    count    INTEGER NOT NULL,
+    PRIMARY KEY (scan_id, severity)
+);
+CREATE INDEX IF NOT EXISTS report_counts_by_severity ON report_counts (severity, scan_id);
+"""
+
+_COLUMNS = "scan_id, target, base_url, generated, total, summary, etag"
+
+
+def _etag(path: Path) -> str:
+    st = path.stat()
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _read(path: Path) -> Dict[str, Any]:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _summary(report: Dict[str, Any]) -> Dict[str, Any]:
+    # у отчётов, собранных write_report, сводки нет — считается по находкам
+    if "summary" in report:
+        return report["summary"]
+    issues = report.get("issues") or []
+    return {
+        "total": len(issues),
+        "by_severity": dict(Counter(i.get("severity") for i in issues)),
+        "by_vulnerability": dict(Counter(i.get("vulnerability") for i in issues)),
+    }
+
+
+def _row(row: tuple) -> Dict[str, Any]:
+    summary = json.loads(row[5])
+    return {
+        "scan_id": row[0],
+        "target": row[1],
+        "base_url": row[2],
+        "generated": row[3],
+        "total": row[4],
+        "by_severity": summary.get("by_severity", {}),
+        "by_vulnerability": summary.get("by_vulnerability", {}),
+    }
+
+
+class ReportStore:
+    """
+    Хранилище итоговых отчётов.
+
+    Отчёты лежат на диске сжатыми (reports/<scan_id>.json.gz; старые несжатые .json
+    тоже читаются). Рядом — индекс в SQLite: цель, время, число находок по severity
+    и ETag каждого отчёта. Списки и фильтры отвечают из индекса, не открывая файлы.
+    Разобранные отчёты держатся в LRU-кэше; запись в кэше действительна, пока её
+    ETag совпадает с индексом. Методы блокирующие — из event loop через asyncio.to_thread.
+    """
+
+    def __init__(self, root: str | Path = REPORTS_DIR, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, Tuple[str, Dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(str(self.root / INDEX_NAME), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        if self._db.execute("SELECT COUNT(*) FROM reports").fetchone()[0] == 0:
+            self.reindex()
+
+    # === запись ===
+
+    def finalize(self, scan_id: str, target: str, base_url: str, summary: Dict[str, Any]):
+        """Собрать отчёт скана из NDJSON находок и занести его в индекс."""
+        head = finalize_report(scan_id, target, base_url, summary)
+        self._add(head, summary, report_path(scan_id))
+
+    def _add(self, head: Dict[str, Any], summary: Dict[str, Any], path: Path):
+        scan_id = head["scan_id"]
+        by_severity = summary.get("by_severity") or {}
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO reports ({_COLUMNS}, path) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scan_id, head.get("target", ""), head.get("base_url", ""), head.get("generated", 0.0),
+                    summary.get("total", 0), json.dumps(summary, ensure_ascii=False), _etag(path), str(path),
+                ),
+            )
+            self._db.execute("DELETE FROM report_counts WHERE scan_id = ?", (scan_id,))
+            self._db.executemany(
+                "INSERT INTO report_counts (scan_id, severity, count) VALUES (?, ?, ?)",
+                [(scan_id, str(sev), count) for sev, count in by_severity.items()],
+            )
+            self._cache.pop(scan_id, None)
+
+    def _add_file(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            report = _read(path)
+        except (OSError, ValueError):
+            return None
+        self._add(report, _summary(report), path)
+        return report
+
+    def reindex(self):
+        """Занести в индекс все отчёты из каталога (первый запуск, потерянный индекс)."""
+        for path in sorted([*self.root.glob("*.json"), *self.root.glob("*.json.gz")]):
+            self._add_file(path)
+
+    # === чтение ===
+
+    def etag(self, scan_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT etag FROM reports WHERE scan_id = ?", (scan_id,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, scan_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(ETag, отчёт) или None, если отчёта нет."""
+        with self._lock:
+            row = self._db.execute("SELECT etag, path FROM reports WHERE scan_id = ?", (scan_id,)).fetchone()
+            cached = self._cache.get(scan_id)
+            if row is not None and cached is not None and cached[0] == row[0]:
+                self._cache.move_to_end(scan_id)
+                return cached
+
+        if row is None:
+            # отчёт появился в обход индекса (скопирован, индекс удалён)
+            for path in (report_path(scan_id), legacy_report_path(scan_id)):
+                if path.exists() and self._add_file(path) is not None:
+                    return self.get(scan_id)
+            return None
+
+        etag, path = row
+        try:
+            report = _read(Path(path))
+        except FileNotFoundError:
+            return None
+
+        if len(report.get("issues") or ()) <= CACHE_MAX_ISSUES:
+            with self._lock:
+                self._cache[scan_id] = (etag, report)
+                self._cache.move_to_end(scan_id)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return etag, report
+
+    def query(
+        self,
+        target: Optional[str] = None,
+        severity: Optional[str] = None,
+        since: Optional[float] = None,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Отчёты по индексу, новые первыми. severity — только сканы с находками этой severity."""
+        where, args = [], []
+        if target is not None:
+            where.append("target = ?")
+            args.append(target)
+        if since is not None:
+            where.append("generated >= ?")
+            args.append(since)
+        if severity is not None:
+            where.append("scan_id IN (SELECT scan_id FROM report_counts WHERE severity = ? AND count > 0)")
+            args.append(severity)
+        sql = f"SELECT {_COLUMNS} FROM reports"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY generated DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*args, limit, offset)).fetchall()
+        return [_row(r) for r in rows]
+
+    def stats(self, target: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Число сканов и находок по severity для каждой цели."""
+        cond, args = ("WHERE r.target = ?", (target,)) if target is not None else ("", ())
+        with self._lock:
+            scans = self._db.execute(
+                f"SELECT target, COUNT(*), SUM(total), MAX(generated) FROM reports r {cond} GROUP BY target", args
+            ).fetchall()
+            counts = self._db.execute(
+                "SELECT r.target, c.severity, SUM(c.count) FROM report_counts c "
+                f"JOIN reports r ON r.scan_id = c.scan_id {cond} GROUP BY r.target, c.severity",
+                args,
+            ).fetchall()
+
+        result = {
+            t: {"scans": n, "issues": total or 0, "last_generated": last, "by_severity": {}}
+            for t, n, total, last in scans
+        }
+        for t, sev, count in counts:
+            result[t]["by_severity"][sev] = count
+        return result
+
+
+@lru_cache(maxsize=1)
+def get_report_store() -> ReportStore:
+    """Общее на процесс хранилище отчётов — создаётся при первом обращении."""
+    return ReportStore()
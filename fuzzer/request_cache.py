@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import httpx
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# параметры send(), остальное уходит в build_request()
+_SEND_KWARGS = ("auth", "follow_redirects")
+
+
+class RequestCache:
+    """
+    Кэш ответов в пределах одного скана поверх httpx.AsyncClient.
+
+    Атаки часто шлют один и тот же запрос (тот же метод, URL, заголовки, cookie, тело)
+    для одного эндпоинта и контекста. Первый ответ переиспользуется всеми последующими
+    одинаковыми запросами, а одновременные одинаковые запросы схлопываются в один.
+    Ключ строится по уже собранному httpx.Request, т.е. с учётом заголовков и cookie
+    самого клиента. Ошибки не кэшируются — их получают только ожидающие того же запроса.
+
+    Кэшируется только request(); остальные атрибуты проксируются в клиент как есть.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.client = client
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._done: OrderedDict[Tuple, httpx.Response] = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    async def request(self, method: str, url: httpx.URL | str, **kwargs) -> httpx.Response:
+        send_kwargs = {k: kwargs.pop(k) for k in _SEND_KWARGS if k in kwargs}
+        request = self.client.build_request(method, url, **kwargs)
+        key = self._key(request, send_kwargs)
+
+        while True:
+            resp = self._done.get(key)
+            if resp is not None:
+                self._done.move_to_end(key)
+                self.hits += 1
+                return resp
+
+            fut = self._inflight.get(key)
+            if fut is None:
+                break
+
+            try:
+                resp = await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # отменили не нас, а владельца запроса — пробуем сами
+                if fut.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            self.hits += 1
+            return resp
+
+        self.misses += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            resp = await self.client.send(request, **send_kwargs)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as exc:
+            fut.set_exception(exc)
+            fut.exception()  # ожидающих может не быть — не шумим в лог asyncio
+            raise
+        else:
+            fut.set_result(resp)
+            self._store(key, resp)
+            return resp
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: Tuple, resp: httpx.Response):
+        self._done[key] = resp
+        if len(self._done) > self.max_entries:
+            self._done.popitem(last=False)
+
+    @staticmethod
+    def _key(request: httpx.Request, send_kwargs: Dict[str, Any]) -> Tuple:
+        headers = tuple(sorted(
+            (k.lower(), v) for k, v in request.headers.multi_items()
+            if k.lower() != "content-length"
+        ))
+        return (
+            request.method.upper(),
+            str(request.url),
+            headers,
+            request.content,
+            tuple(sorted((k, repr(v)) for k, v in send_kwargs.items())),
+        )
@@ -1,18 +1,44 @@
-from fuzzer.runners.juice_shop import run_juice_shop
-from fuzzer.runners.dvwa import run_dvwa
-from fuzzer.runners.bwapp import run_bwapp
+import importlib
+
+from fuzzer.plugins import RUNNERS_GROUP, PluginRegistry
 from fuzzer.runners.storage import parse_proxy_log
 
-RUNNERS = {
-    "juice-shop": run_juice_shop,
-    "dvwa": run_dvwa,
-    "bwapp": run_bwapp,
+
+def _scenarios():
+    from fuzzer.runners.scenario import load_scenario_runners
+    return load_scenario_runners()
+
+
+# runner'ы по имени цели; модуль runner'а импортируется при первом скане этой цели.
+# YAML-сценарии (fuzzer/runners/scenarios, ./scenarios) перекрывают одноимённые runner'ы
+RUNNERS = PluginRegistry(RUNNERS_GROUP, {
+    "juice-shop": "fuzzer.runners.juice_shop:run_juice_shop",
+    "dvwa": "fuzzer.runners.dvwa:run_dvwa",
+    "bwapp": "fuzzer.runners.bwapp:run_bwapp",
+}, discover=_scenarios)
+
+_LAZY = {
+    "run_juice_shop": "fuzzer.runners.juice_shop",
+    "run_dvwa": "fuzzer.runners.dvwa",
+    "run_bwapp": "fuzzer.runners.bwapp",
+    "run_scenario": "fuzzer.runners.scenario",
+    "load_scenario": "fuzzer.runners.scenario",
 }
 
+
+def __getattr__(name: str):
+    # старые импорты вида `from fuzzer.runners import run_dvwa` продолжают работать
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "RUNNERS",
     "parse_proxy_log",
     "run_juice_shop",
     "run_dvwa",
     "run_bwapp",
+    "run_scenario",
+    "load_scenario",
 ]
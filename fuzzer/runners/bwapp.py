@@ -1,12 +1,14 @@
 import httpx
+from typing import Optional
 from urllib.parse import urljoin
 
-PROXIES = {"http://": "http://127.0.0.1:8083"}
+from fuzzer.http_client import borrow_client
 
-async def run_bwapp(base_url: str):
+
+async def run_bwapp(base_url: str, client: Optional[httpx.AsyncClient] = None):
     login_url = urljoin(base_url, "/login.php")
 
-    async with httpx.AsyncClient(proxies=PROXIES) as client:
+    async with borrow_client(client) as client:
         await client.get(login_url)
 
         data = {
@@ -1,13 +1,15 @@
 import httpx
+from typing import Optional
 from urllib.parse import urljoin
 
-PROXIES = {"http://": "http://127.0.0.1:8083"}
+from fuzzer.http_client import borrow_client
 
-async def run_dvwa(base_url: str):
+
+async def run_dvwa(base_url: str, client: Optional[httpx.AsyncClient] = None):
     login_page = urljoin(base_url, "/login.php")
 
 
-    async with httpx.AsyncClient(proxy="http://127.0.0.1:8083", verify=False) as client:
+    async with borrow_client(client) as client:
         await client.get(login_page)
 
         # 2. POST login
@@ -1,10 +1,13 @@
 import httpx
+from typing import Optional
 from urllib.parse import urljoin
 
+from fuzzer.http_client import borrow_client
 
-async def run_juice_shop(base_url: str):
 
-    async with httpx.AsyncClient(proxy="http://127.0.0.1:8083", verify=False) as client:
+async def run_juice_shop(base_url: str, client: Optional[httpx.AsyncClient] = None):
+
+    async with borrow_client(client) as client:
         await client.get(base_url)
 
         # 2. Регистрация (любая почта)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+
+import httpx
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from fuzzer.http_client import borrow_client
+
+log = logging.getLogger("fuzzer")
+
+# встроенные сценарии и каталог для своих (новая цель — новый YAML, без кода)
+BUILTIN_DIR = Path(__file__).parent / "scenarios"
+USER_DIR = Path("scenarios")
+
+_VAR = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# откуда extract достаёт значение: <источник>:<аргумент>
+EXTRACT_SOURCES = ("json", "header", "cookie", "regex")
+
+
+class _Missing(Exception):
+    pass
+
+
+class ScenarioStep(BaseModel):
+    """
+    Один запрос сценария. Шаги без общих зависимостей (needs) выполняются одновременно.
+    В path, params, headers, data и json подставляются переменные {{ name }};
+    extract задаёт, какие переменные достать из ответа для следующих шагов:
+      json:a.b.c — поле JSON-ответа, header:Name — заголовок, cookie:name — cookie,
+      regex:шаблон — первая группа (или всё совпадение) в тексте ответа.
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    name: str
+    method: str = "GET"
+    path: str
+    needs: List[str] = []
+    params: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    data: Optional[Dict[str, str]] = None
+    json_body: Optional[Any] = Field(None, alias="json")
+    extract: Dict[str, str] = {}
+
+    @field_validator("extract")
+    @classmethod
+    def _check_extract(cls, extract: Dict[str, str]) -> Dict[str, str]:
+        # ошибка в YAML видна при загрузке, а не посреди сценария, когда трафик уже идёт
+        for var, spec in extract.items():
+            kind, sep, arg = spec.partition(":")
+            if kind not in EXTRACT_SOURCES or not sep or not arg:
+                raise ValueError(f"extract {var}: expected one of {', '.join(EXTRACT_SOURCES)} "
+                                 f"as <source>:<arg>, got {spec!r}")
+            if kind == "regex":
+                try:
+                    re.compile(arg)
+                except re.error as exc:
+                    raise ValueError(f"extract {var}: bad regex {arg!r}: {exc}") from exc
+        return extract
+
+
+class Scenario(BaseModel):
+    name: str
+    vars: Dict[str, str] = {}
+    steps: List[ScenarioStep]
+
+    @model_validator(mode="after")
+    def _check_graph(self) -> "Scenario":
+        names = [s.name for s in self.steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"scenario {self.name}: duplicate step names")
+        known = set(names)
+        for step in self.steps:
+            unknown = set(step.needs) - known
+            if unknown:
+                raise ValueError(f"scenario {self.name}: step {step.name} needs unknown {sorted(unknown)}")
+
+        # цикл в зависимостях — сценарий никогда не закончится
+        state: Dict[str, int] = {}
+        deps = {s.name: s.needs for s in self.steps}
+
+        def visit(name: str):
+            if state.get(name) == 1:
+                raise ValueError(f"scenario {self.name}: dependency cycle through {name}")
+            if state.get(name) == 2:
+                return
+            state[name] = 1
+            for dep in deps[name]:
+                visit(dep)
+            state[name] = 2
+
+        for name in names:
+            visit(name)
+        return self
+
+
+def _render(value: Any, variables: Dict[str, str], strict: bool = False) -> Any:
+    if isinstance(value, str):
+        def sub(m: re.Match) -> str:
+            if m.group(1) in variables:
+                return str(variables[m.group(1)])
+            if strict:
+                raise _Missing(m.group(1))
+            return ""
+        return _VAR.sub(sub, value)
+    if isinstance(value, dict):
+        return {k: _render(v, variables, strict) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, variables, strict) for v in value]
+    return value
+
+
+def _extract(resp: httpx.Response, spec: str) -> Optional[str]:
+    kind, _, arg = spec.partition(":")
+    if kind == "json":
+        try:
+            value: Any = resp.json()
+        except ValueError:
+            return None
+        for part in arg.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return None if value is None else str(value)
+    if kind == "header":
+        return resp.headers.get(arg)
+    if kind == "cookie":
+        return resp.cookies.get(arg)
+    if kind == "regex":
+        m = re.search(arg, resp.text)
+        if m is None:
+            return None
+        return m.group(1) if m.groups() else m.group(0)
+    raise ValueError(f"unknown extract source: {spec}")
+
+
+async def run_scenario(scenario: Scenario, base_url: str, client: Optional[httpx.AsyncClient] = None):
+    """Выполнить сценарий: каждый шаг стартует, как только выполнены все его needs."""
+    variables: Dict[str, str] = {"base_url": base_url, **scenario.vars}
+
+    async with borrow_client(client) as client:
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: ScenarioStep) -> bool:
+            if step.needs and not all(await asyncio.gather(*(tasks[d] for d in step.needs))):
+                log.info(f"[SCENARIO {scenario.name}] skip {step.name}: a dependency failed")
+                return False
+
+            # заголовок с неизвестной переменной не отправляется (нет токена — нет Authorization)
+            headers = {}
+            for k, v in step.headers.items():
+                try:
+                    headers[k] = _render(v, variables, strict=True)
+                except _Missing:
+                    pass
+
+            try:
+                resp = await client.request(
+                    step.method,
+                    urljoin(base_url, _render(step.path, variables)),
+                    params=_render(step.params, variables) or None,
+                    headers=headers,
+                    data=_render(step.data, variables),
+                    json=_render(step.json_body, variables),
+                )
+            except httpx.HTTPError as exc:
+                log.warning(f"[SCENARIO {scenario.name}] step {step.name} failed: {exc!r}")
+                return False
+
+            for var, spec in step.extract.items():
+                value = _extract(resp, spec)
+                if value is not None:
+                    variables[var] = value
+            return True
+
+        # все задачи создаются до первого await, так что tasks[d] уже есть к моменту ожидания
+        for step in scenario.steps:
+            tasks[step.name] = asyncio.create_task(run_step(step), name=f"scenario-{scenario.name}-{step.name}")
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            # шаг упал или сценарий отменён — остальные шаги не должны слать трафик дальше
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+def load_scenario(path: str | Path) -> Scenario:
+    with open(path, encoding="utf-8") as f:
+        return Scenario.model_validate(yaml.safe_load(f))
+
+
+def scenario_runner(scenario: Scenario) -> Callable[..., Awaitable[None]]:
+    """Сценарий в виде runner'а с сигнатурой run_x(base_url, client=None)."""
+    async def run(base_url: str, client: Optional[httpx.AsyncClient] = None):
+        await run_scenario(scenario, base_url, client)
+    run.__name__ = f"run_{scenario.name.replace('-', '_')}"
+    return run
+
+
+def load_scenario_runners(dirs: Iterable[Path] = (BUILTIN_DIR, USER_DIR)) -> Dict[str, Callable[..., Awaitable[None]]]:
+    """Runner'ы из *.yaml/*.yml в dirs; при совпадении имён побеждает более поздний каталог."""
+    runners: Dict[str, Callable[..., Awaitable[None]]] = {}
+    for d in dirs:
+        if not d.is_dir():
+            continue
+        for path in sorted([*d.glob("*.yaml"), *d.glob("*.yml")]):
+            try:
+                scenario = load_scenario(path)
+            except Exception as exc:
+                log.warning(f"Bad scenario {path}: {exc}")
+                continue
+            runners[scenario.name] = scenario_runner(scenario)
+    return runners
@@ -1,12 +1,27 @@
 from __future__ import annotations
 
+import gzip
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from fuzzer.models import Endpoint, AuthContext
 
+# заголовок, которым engine помечает трафик атак — такие записи не являются разведкой
+ATTACK_MARKER = "X-Fuzzer-Scan"
+ATTACK_MARKER_LOWER = ATTACK_MARKER.lower()
+
+# трафик разведки помечается этим заголовком, и Recorder пишет его в сегмент скана
+# (см. proxy/addon.py): traffic/<scan_id>/<host>_<port>.jsonl
+SCAN_HEADER = "X-Fuzzer-Recon"
+TRAFFIC_DIR = "traffic"
+LEGACY_LOG = "proxy_log.jsonl"
+
+# запрос-сигнал: Recorder сбрасывает буфер записи скана и подтверждает FLUSH_ACK
+FLUSH_HEADER = "X-Fuzzer-Flush"
+FLUSH_ACK = "X-Fuzzer-Flushed"
+
 
 def _parse_cookie_header(cookie_header: str) -> Dict[str, str]:
     cookies = {}
@@ -18,92 +33,281 @@ def _parse_cookie_header(cookie_header: str) -> Dict[str, str]:
     return cookies
 
 
-def parse_proxy_log(log_path: str | Path = "proxy_log.jsonl") -> Tuple[List[Endpoint], List[AuthContext]]:
-    log_path = Path(log_path)
-    if not log_path.exists():
-        return [], []
+def _decode_body(raw):
+    """
+    Тело запроса из записи Recorder'а (req_body — строка). JSON-тела разбираются
+    в dict/list, чтобы атаки могли подставлять значения в поля; остальное — как есть.
+    """
+    if not raw:
+        return None
+    if isinstance(raw, str) and raw.lstrip()[:1] in ("{", "["):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            pass
+    return raw
 
-    endpoints_map: Dict[tuple, Endpoint] = {}
-    cookies_global: Dict[str, str] = {}
-    headers_global: Dict[str, str] = {}
-    jwt_tokens: set[str] = set()
 
-    with log_path.open(encoding="utf-8") as f:
-        for line in f:
-            if not line.strip():
-                continue
+# порядок ключей фиксирован json.dumps в Recorder: "stage" идёт вторым, сразу после "t"
+_STAGE_PROBE = 64
+_SKIP_STAGES = ('"stage": "response"',)
+_MARKER_PROBES = (f'"{ATTACK_MARKER}"', f'"{ATTACK_MARKER.lower()}"')
 
-            try:
-                entry = json.loads(line)
-            except Exception:
-                continue
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class _EndpointRecord:
+    """Внутреннее компактное представление эндпоинта; Endpoint строится только на выходе."""
+    __slots__ = ("method", "base_url", "path", "params", "headers", "body", "has_auth_cookie", "has_auth_header")
+
+    def __init__(self, method: str, base_url: str, path: str, params: dict):
+        self.method = method
+        self.base_url = base_url
+        self.path = path
+        self.params = params
+        self.headers: Dict[str, str] = {}
+        self.body = None
+        self.has_auth_cookie = False
+        self.has_auth_header = False
+
+    def to_endpoint(self) -> Endpoint:
+        return Endpoint(
+            method=self.method,
+            path=self.path,
+            base_url=self.base_url,
+            headers=self.headers,
+            params=self.params,
+            body=_decode_body(self.body),
+            has_auth_cookie=self.has_auth_cookie,
+            has_auth_header=self.has_auth_header,
+        )
+
+
+class ProxyLogParser:
+    """
+    Инкрементальный разбор proxy_log.jsonl: строки можно скармливать по одной,
+    по мере их появления в логе. Используется и пакетным parse_proxy_log,
+    и конвейерным режимом (fuzzer.pipeline).
 
-            # host + path → полный URL
-            host = entry.get("host")
-            raw_path = entry.get("path") or "/"
+    Записи stage=response (дубли request-записей того же потока) и трафик атак
+    отбрасываются по подстроке, до json.loads. Эндпоинты внутри хранятся как
+    _EndpointRecord; pydantic-модели создаются только в endpoints() и для
+    впервые встреченных эндпоинтов в feed().
+    """
 
-            if not host:
-                continue  # запись повреждена
+    def __init__(self):
+        self.endpoints_map: Dict[tuple, _EndpointRecord] = {}
+        self.cookies: Dict[str, str] = {}
+        self.headers: Dict[str, str] = {}
+        self.jwt_tokens: set[str] = set()
 
-            full_url = f"http://{host}{raw_path}"
+    def feed_line(self, line: str) -> Optional[Endpoint]:
+        """Разобрать строку лога. Возвращает Endpoint, если он встретился впервые."""
+        record, created = self._feed_line(line)
+        return record.to_endpoint() if created else None
 
-            # разбираем URL
-            parsed = urlparse(full_url)
+    def feed(self, entry: dict) -> Optional[Endpoint]:
+        record, created = self._feed(entry)
+        return record.to_endpoint() if created else None
+
+    def _feed_line(self, line: str) -> Tuple[Optional[_EndpointRecord], bool]:
+        head = line[:_STAGE_PROBE]
+        if any(p in head for p in _SKIP_STAGES):
+            return None, False
+        if any(p in line for p in _MARKER_PROBES):
+            return None, False  # собственный трафик атак
+        if not line.strip():
+            return None, False
+
+        try:
+            entry = json.loads(line)
+        except Exception:
+            return None, False
+
+        # лог мог писать не Recorder — тогда порядок ключей другой
+        if entry.get("stage") == "response":
+            return None, False
+        return self._feed(entry)
+
+    def _feed(self, entry: dict) -> Tuple[Optional[_EndpointRecord], bool]:
+        host = entry.get("host")
+        raw_path = entry.get("path") or "/"
+
+        if not host:
+            return None, False  # запись повреждена
+
+        req_headers = entry.get("req_headers") or {}
+
+        # один проход по заголовкам: пометка атак, авторизация, cookie
+        auth_header = None
+        cookie_header = None
+        for hk in req_headers:
+            lk = hk.lower()
+            if lk == "authorization":
+                auth_header = req_headers[hk]
+            elif lk == "cookie":
+                cookie_header = req_headers[hk]
+            elif lk == ATTACK_MARKER_LOWER:
+                return None, False  # собственный трафик атак
+
+        # схема и порт пишутся Recorder'ом с недавних пор; в старых логах их нет
+        scheme = entry.get("scheme") or "http"
+        port = entry.get("port")
+        if port and port != _DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{port}"
+
+        if raw_path.startswith("/") and "?" not in raw_path and "#" not in raw_path:
+            # обычный случай: Recorder пишет уже разобранный path
+            base_url = f"{scheme}://{host}"
+            path = raw_path
+        else:
+            parsed = urlparse(f"{scheme}://{host}{raw_path}")
             base_url = f"{parsed.scheme}://{parsed.netloc}"
             path = parsed.path or "/"
 
-            method = entry.get("method", "GET")
-
-            key = (method, base_url, path)
-
-            # создаём Endpoint если его ещё нет
-            ep = endpoints_map.get(key)
-            if not ep:
-                ep = Endpoint(
-                    method=method,
-                    path=path,
-                    base_url=base_url,            # ← FIX
-                    headers={},
-                    params=entry.get("query") or {},
-                    body=None,
-                    has_auth_cookie=False,
-                    has_auth_header=False,
-                )
-                endpoints_map[key] = ep
-
-            # заголовки
-            req_headers = entry.get("req_headers") or {}
-            ep.headers = req_headers
-
-            # тело
-            ep.body = entry.get("body") or None
-
-            # флаг авторизации в заголовке
-            if "authorization" in {k.lower(): v for k, v in req_headers.items()}:
-                ep.has_auth_header = True
-
-            # парсим Cookie
-            cookie_header = req_headers.get("Cookie") or req_headers.get("cookie")
-            if cookie_header:
-                parsed = _parse_cookie_header(cookie_header)
-                cookies_global.update(parsed)
-                ep.has_auth_cookie = True
+        method = entry.get("method", "GET")
+        key = (method, base_url, path)
+
+        record = self.endpoints_map.get(key)
+        created = record is None
+        if created:
+            record = _EndpointRecord(method, base_url, path, entry.get("query") or {})
+            self.endpoints_map[key] = record
 
+        record.headers = req_headers
+        # Recorder пишет тело в req_body; "body" — в логах, записанных не им.
+        # Разбирается тело один раз, при сборке Endpoint
+        record.body = entry.get("req_body") or entry.get("body") or None
+
+        # заголовки копятся в общий контекст как есть
+        self.headers.update(req_headers)
+
+        if auth_header is not None:
+            record.has_auth_header = True
             # собираем JWT
-            for hk, hv in req_headers.items():
-                headers_global[hk] = hv
-                if hk.lower() == "authorization" and "bearer " in hv.lower():
-                    try:
-                        jwt_tokens.add(hv.split()[1])
-                    except Exception:
-                        pass
+            if "bearer " in auth_header.lower():
+                parts = auth_header.split()
+                if len(parts) > 1:
+                    self.jwt_tokens.add(parts[1])
+
+        if cookie_header:
+            self.cookies.update(_parse_cookie_header(cookie_header))
+            record.has_auth_cookie = True
+
+        return record, created
+
+    def endpoints(self) -> List[Endpoint]:
+        return [r.to_endpoint() for r in self.endpoints_map.values()]
+
+    def context(self) -> AuthContext:
+        """Снимок накопленного контекста авторизации."""
+        return AuthContext(
+            base_url="",  # этот параметр мы не храним глобально
+            cookies=dict(self.cookies),
+            headers=dict(self.headers),
+            jwt_tokens=list(self.jwt_tokens),
+        )
+
+
+def iter_log_lines(log_path: str | Path) -> Iterator[str]:
+    """
+    Строки лога: сначала закрытые сегменты (после ротации в Recorder), затем текущий файл.
+
+    Recorder может ротировать лог, пока он читается: сегмент сначала переименовывается,
+    потом сжимается в .gz, и несжатый файл удаляется. Пока есть несжатый файл, читается
+    он (.gz рядом может быть недописан); исчез — читается .gz. Текущий файл, исчезнувший
+    между листингом и чтением, пропускается.
+    """
+    log_path = Path(log_path)
+
+    def segment_order(seg: Path) -> int:
+        # <имя лога>.<мс>[.gz]
+        stamp = seg.name[len(log_path.name) + 1:].split(".")[0]
+        return int(stamp) if stamp.isdigit() else 0
+
+    # сегмент -> варианты файла: сначала несжатый, потом .gz
+    segments: Dict[int, List[Path]] = {}
+    for seg in log_path.parent.glob(log_path.name + ".*"):
+        segments.setdefault(segment_order(seg), []).append(seg)
+
+    for stamp in sorted(segments):
+        for seg in sorted(segments[stamp], key=lambda p: p.suffix == ".gz"):
+            opener = gzip.open if seg.suffix == ".gz" else open
+            try:
+                f = opener(seg, "rt", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                yield from f
+            break
+
+    try:
+        f = log_path.open(encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from f
+
+
+def host_key(base_url: str) -> str:
+    """Имя сегмента хоста, как его строит Recorder: <host>_<port>."""
+    parsed = urlparse(base_url)
+    port = parsed.port or _DEFAULT_PORTS.get(parsed.scheme, 80)
+    return f"{parsed.hostname}_{port}".replace("/", "_").replace(":", "_")
+
+
+def scan_traffic_path(scan_id: str, base_url: str) -> Path:
+    """Текущий файл сегмента скана для хоста base_url."""
+    return Path(TRAFFIC_DIR) / scan_id / f"{host_key(base_url)}.jsonl"
+
+
+def scan_traffic_logs(scan_id: str, hosts: Optional[Iterable[str]] = None) -> Optional[List[Path]]:
+    """
+    Сегменты скана по хостам (hosts — ключи host_key, None — все хосты).
+    None, если у скана нет своего каталога (старый Recorder или скан без прокси).
+    """
+    scan_dir = Path(TRAFFIC_DIR) / scan_id
+    if not scan_dir.is_dir():
+        return None
+    # <host>_<port>.jsonl[.<мс>[.gz]] → <host>_<port>
+    stems = sorted({f.name.split(".jsonl")[0] for f in scan_dir.iterdir() if ".jsonl" in f.name})
+    if hosts is not None:
+        wanted = set(hosts)
+        stems = [s for s in stems if s in wanted]
+    return [scan_dir / f"{stem}.jsonl" for stem in stems]
+
+
+def traffic_size(scan_id: Optional[str] = None) -> int:
+    """Сколько байт трафика уже на диске: сегменты скана или, если их нет, общий лог."""
+    scan_dir = Path(TRAFFIC_DIR) / scan_id if scan_id else None
+    if scan_dir is not None and scan_dir.is_dir():
+        files = [f for f in scan_dir.iterdir() if f.is_file()]
+    else:
+        files = [Path(LEGACY_LOG)]
+    return sum(f.stat().st_size for f in files if f.exists())
+
+
+def parse_proxy_log(
+    log_path: str | Path = LEGACY_LOG,
+    scan_id: Optional[str] = None,
+    hosts: Optional[Iterable[str]] = None,
+) -> Tuple[List[Endpoint], List[AuthContext]]:
+    """
+    Эндпоинты и контекст авторизации из записанного трафика. С scan_id читаются
+    только сегменты этого скана (и только hosts, если заданы); если их нет —
+    общий лог log_path, как раньше.
+    """
+    parser = ProxyLogParser()
+    feed_line = parser._feed_line
+
+    paths = scan_traffic_logs(scan_id, hosts) if scan_id else None
+    for path in paths if paths is not None else [log_path]:
+        for line in iter_log_lines(path):
+            # pydantic-модели строятся один раз, в parser.endpoints()
+            feed_line(line)
+
+    if not parser.endpoints_map and not parser.jwt_tokens:
+        return [], []
 
     # формируем контекст
-    ctx = AuthContext(
-        base_url="",  # этот параметр мы не храним глобально
-        cookies=cookies_global,
-        headers=headers_global,
-        jwt_tokens=list(jwt_tokens),
-    )
-
-    return list(endpoints_map.values()), [ctx]
+    return parser.endpoints(), [parser.context()]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from fuzzer.engine import run_scan, scan_status
+from fuzzer.options import ScanOptions
+
+log = logging.getLogger("fuzzer")
+
+DEFAULT_MAX_SCANS = 2
+
+
+@dataclass(order=True)
+class QueuedScan:
+    # порядок в очереди: больший priority раньше, при равных — FIFO
+    sort_key: tuple
+    scan_id: str = field(compare=False)
+    target: str = field(compare=False)
+    base_url: str = field(compare=False)
+    options: ScanOptions = field(compare=False)
+    resume: bool = field(default=False, compare=False)
+    priority: int = field(default=0, compare=False)
+    queued: float = field(default_factory=time.time, compare=False)
+
+
+class ScanQueue:
+    """
+    Очередь сканов сервиса: одновременно выполняется не больше max_concurrent,
+    остальные ждут в порядке приоритета (при равном — в порядке постановки).
+    Сканы из очереди и выполняющиеся можно отменить. Состояние — в engine.scan_status:
+    пока скан в очереди, там статус "queued", дальше его ведёт run_scan.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_SCANS):
+        self.max_concurrent = max(1, max_concurrent)
+        self._queue: asyncio.PriorityQueue[QueuedScan] = asyncio.PriorityQueue()
+        self._pending: Dict[str, QueuedScan] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+
+    def _start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"scan-queue-worker-{i}")
+            for i in range(self.max_concurrent)
+        ]
+
+    def submit(
+        self,
+        scan_id: str,
+        target: str,
+        base_url: str,
+        options: ScanOptions,
+        priority: int = 0,
+        resume: bool = False,
+    ) -> int:
+        """Поставить скан в очередь. Возвращает позицию в очереди (0 — следующий)."""
+        self._start()
+        item = QueuedScan(
+            sort_key=(-priority, next(self._seq)),
+            scan_id=scan_id,
+            target=target,
+            base_url=base_url,
+            options=options,
+            resume=resume,
+            priority=priority,
+        )
+        self._pending[scan_id] = item
+        scan_status[scan_id] = {
+            "status": "queued",
+            "done": 0,
+            "total": 1,
+            "progress": 0.0,
+            "issues": 0,
+            "priority": priority,
+            "queued": item.queued,
+        }
+        self._queue.put_nowait(item)
+        return self.position(scan_id)
+
+    def position(self, scan_id: str) -> Optional[int]:
+        item = self._pending.get(scan_id)
+        if item is None:
+            return None
+        return sum(1 for other in self._pending.values() if other.sort_key < item.sort_key)
+
+    def is_active(self, scan_id: str) -> bool:
+        return scan_id in self._pending or scan_id in self._running
+
+    def cancel(self, scan_id: str) -> Optional[str]:
+        """
+        Отменить скан в очереди или выполняющийся. Возвращает "cancelled" (снят с очереди),
+        "cancelling" (выполнение прерывается) или None, если такого активного скана нет.
+        """
+        if self._pending.pop(scan_id, None) is not None:
+            # из PriorityQueue элемент не достать — воркер пропустит его сам
+            scan_status[scan_id]["status"] = "cancelled"
+            log.info(f"[SCAN {scan_id}] Cancelled while queued")
+            return "cancelled"
+        task = self._running.get(scan_id)
+        if task is not None:
+            task.cancel()
+            return "cancelling"
+        return None
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            if self._pending.get(item.scan_id) is not item:
+                continue  # отменён, пока ждал в очереди (или поставлен заново)
+            del self._pending[item.scan_id]
+
+            task = asyncio.create_task(
+                run_scan(item.scan_id, item.target, item.base_url, item.options, resume=item.resume),
+                name=f"scan-{item.scan_id}",
+            )
+            self._running[item.scan_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                # отменили сам скан — воркер продолжает; отменили воркер — выходим
+                if not task.cancelled() or asyncio.current_task().cancelling():
+                    task.cancel()
+                    raise
+            except Exception:
+                pass  # run_scan уже записал статус failed и трейсбек в лог
+            finally:
+                self._running.pop(item.scan_id, None)
+
+    async def aclose(self):
+        for task in self._running.values():
+            task.cancel()
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._running.values(), *self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from fuzzer.attacks.base import AttackStrategy, AttackResult
+from fuzzer.metrics import ATTACK_JOBS, ATTACK_LATENCY, current_attack
+from fuzzer.models import Endpoint, AuthContext
+
+log = logging.getLogger("fuzzer")
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PER_HOST = 8
+
+# прогресс пишется в лог не чаще, чем раз в столько секунд
+PROGRESS_LOG_INTERVAL = 5.0
+
+
+@dataclass
+class AttackJob:
+    endpoint: Endpoint
+    ctx: AuthContext
+    attack: AttackStrategy
+    # стабильный идентификатор задачи для чекпоинтов (см. planner.job_key)
+    key: str = ""
+
+
+def job_host(job: AttackJob) -> str:
+    return urlparse(job.endpoint.base_url).netloc or job.endpoint.base_url
+
+
+class AttackScheduler:
+    """
+    Параллельное выполнение задач (endpoint, context, attack).
+    Применимость задач проверяет планировщик (fuzzer.planner) — сюда приходят только применимые.
+    Глобальный лимит задаёт число воркеров, per-host лимит — семафор на хост.
+    Задачи можно докидывать через submit() пока планировщик запущен.
+    """
+
+    def __init__(
+        self,
+        scan_id: str,
+        client: httpx.AsyncClient,
+        status: Optional[dict] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        per_host: int = DEFAULT_PER_HOST,
+        on_job_done: Optional[Callable[[AttackJob, List[AttackResult]], None]] = None,
+        already_done: int = 0,
+        collect: bool = True,
+        on_job_failed: Optional[Callable[[AttackJob, BaseException], None]] = None,
+    ):
+        self.scan_id = scan_id
+        self.client = client
+        self.status = status if status is not None else {}
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.on_job_done = on_job_done
+        # задача, в которой атака упала, выполненной не считается: on_job_done для неё
+        # не вызывается (её не должны запомнить чекпоинты), вместо него — on_job_failed
+        self.on_job_failed = on_job_failed
+        # collect=False — находки не копятся в памяти, их забирает on_job_done
+        self.collect = collect
+
+        self.issues: List[AttackResult] = []
+        # при продолжении скана уже выполненные задачи входят в прогресс
+        self.done = already_done
+        self.total = already_done
+        self.failed = 0
+
+        self._queue: asyncio.Queue[Optional[AttackJob]] = asyncio.Queue()
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._workers: List[asyncio.Task] = []
+        self._last_progress_log = 0.0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"scan-{self.scan_id}-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    def submit(self, job: AttackJob):
+        self.total += 1
+        self._queue.put_nowait(job)
+        self._update_status()
+
+    async def join(self) -> List[AttackResult]:
+        # по одному стоп-сигналу на воркер: очередь FIFO, так что все задачи успеют выполниться
+        for _ in self._workers:
+            self._queue.put_nowait(None)
+        try:
+            await asyncio.gather(*self._workers)
+        except asyncio.CancelledError:
+            await self.cancel()
+            raise
+        return self.issues
+
+    async def cancel(self):
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def run(self, jobs: Iterable[AttackJob]) -> List[AttackResult]:
+        self.start()
+        for job in jobs:
+            self.submit(job)
+        return await self.join()
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_host)
+            self._host_limits[host] = sem
+        return sem
+
+    def _update_status(self):
+        self.status["done"] = self.done
+        self.status["total"] = max(1, self.total)
+        self.status["progress"] = self.done / max(1, self.total)
+        self.status["failed"] = self.failed
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job is None:
+                return
+            error: Optional[BaseException] = None
+            results: List[AttackResult] = []
+            try:
+                results = await self._run_job(job)
+            except Exception as exc:
+                error = exc
+            finally:
+                # счётчик увеличивается по факту завершения, порядок не важен
+                self.done += 1
+                if error is not None:
+                    self.failed += 1
+                self._update_status()
+                self._log_progress(job)
+            # отменённая задача сюда не доходит и выполненной не считается
+            if error is not None:
+                if self.on_job_failed is not None:
+                    self.on_job_failed(job, error)
+            elif self.on_job_done is not None:
+                self.on_job_done(job, results)
+
+    def _log_progress(self, job: AttackJob):
+        now = time.monotonic()
+        if now - self._last_progress_log < PROGRESS_LOG_INTERVAL and self.done < self.total:
+            return
+        self._last_progress_log = now
+        log.info(
+            f"[SCAN {self.scan_id}] {make_progress_bar(self.done, self.total)} | "
+            f"last: {job.attack.__class__.__name__} -> {job.endpoint.method} {job.endpoint.path}"
+        )
+
+    async def _run_job(self, job: AttackJob) -> List[AttackResult]:
+        ep, ctx, attack = job.endpoint, job.ctx, job.attack
+
+        async with self._host_limit(job_host(job)):
+            token = current_attack.set(attack.name)
+            start = time.perf_counter()
+            try:
+                results = await attack.run(ep, ctx, self.client)
+            except Exception as exc:
+                ATTACK_JOBS.inc((self.scan_id, attack.name, "error"))
+                log.warning(
+                    f"[SCAN {self.scan_id}] ERROR in {attack.__class__.__name__}: {exc}"
+                )
+                raise
+            finally:
+                ATTACK_LATENCY.observe((self.scan_id, attack.name), time.perf_counter() - start)
+                current_attack.reset(token)
+
+        ATTACK_JOBS.inc((self.scan_id, attack.name, "ok"))
+        if self.collect:
+            self.issues.extend(results)
+        return results
+
+
+def make_progress_bar(done: int, total: int, length: int = 28) -> str:
+    if total == 0:
+        total = 1
+
+    filled = int(length * (done / total))
+    empty = length - filled
+    return f"[{'#' * filled}{'-' * empty}] {done}/{total} ({round(done / total * 100)}%)"
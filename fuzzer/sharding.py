@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import traceback
+from typing import AbstractSet, Any, Callable, Dict, List, Optional
+
+from fuzzer.attacks.base import AttackStrategy, AttackResult
+from fuzzer.models import Endpoint, AuthContext
+from fuzzer.options import ScanOptions
+
+log = logging.getLogger("fuzzer")
+
+# как часто координатор проверяет, живы ли воркеры
+POLL_INTERVAL = 0.5
+
+
+def shard_endpoints(endpoints: List[Endpoint], workers: int) -> List[List[Endpoint]]:
+    """
+    Разбить эндпоинты по шардам. Все задачи одного эндпоинта попадают в один шард,
+    чтобы кэш запросов и JWT-разборов внутри процесса продолжал работать.
+    """
+    shards: List[List[Endpoint]] = [[] for _ in range(workers)]
+    for i, ep in enumerate(endpoints):
+        shards[i % workers].append(ep)
+    return [s for s in shards if s]
+
+
+def _share(total: int, shards: int, shard_id: int) -> int:
+    """Доля шарда в общем бюджете total; остаток достаётся первым шардам, но не меньше 1."""
+    base, extra = divmod(total, shards)
+    return max(1, base + (1 if shard_id < extra else 0))
+
+
+def shard_options(options: ScanOptions, shards: int, shard_id: int) -> ScanOptions:
+    """
+    Настройки шарда. Все шарды атакуют одну цель, поэтому общая параллельность,
+    per_host и AIMD-лимиты делятся между ними, а не выдаются каждому целиком.
+    """
+    rate = options.rate.model_copy(update={
+        "initial": _share(options.rate.initial, shards, shard_id),
+        "max_limit": _share(options.rate.max_limit, shards, shard_id),
+    })
+    return options.model_copy(update={
+        "concurrency": _share(options.concurrency, shards, shard_id),
+        "per_host": _share(options.per_host, shards, shard_id),
+        "rate": rate,
+    })
+
+
+def _shard_main(
+    shard_id: int,
+    scan_id: str,
+    endpoints: List[Dict[str, Any]],
+    contexts: List[Dict[str, Any]],
+    attack_names: List[str],
+    options: ScanOptions,
+    skip: List[str],
+    out: mp.Queue,
+):
+    """Точка входа процесса-воркера: свой event loop, свой пул соединений."""
+    try:
+        asyncio.run(_run_shard(shard_id, scan_id, endpoints, contexts, attack_names, options, skip, out))
+        out.put(("finished", shard_id, None))
+    except BaseException:
+        out.put(("failed", shard_id, traceback.format_exc()))
+
+
+async def _run_shard(
+    shard_id: int,
+    scan_id: str,
+    endpoints: List[Dict[str, Any]],
+    contexts: List[Dict[str, Any]],
+    attack_names: List[str],
+    options: ScanOptions,
+    skip: List[str],
+    out: mp.Queue,
+):
+    # импорт здесь: engine сам импортирует этот модуль
+    from fuzzer.engine import attack_client, scan_attacks
+    from fuzzer.http_client import ClientFactory
+    from fuzzer.job_store import get_store
+    from fuzzer.planner import build_plan
+    from fuzzer.scheduler import AttackJob, AttackScheduler
+
+    by_name = {a.name: a for a in scan_attacks(options)}
+    # у процесса своё соединение с SQLite; позиции перебора пишутся в ту же базу
+    store = get_store() if options.checkpoint else None
+    for attack in by_name.values():
+        attack.bind(scan_id, store)
+    eps = [Endpoint(**e) for e in endpoints]
+    ctxs = [AuthContext(**c) for c in contexts]
+
+    def on_job_done(job: AttackJob, results: List[AttackResult]):
+        # прогресс и находки уходят координатору сразу, а не в конце шарда
+        out.put(("job", shard_id, (job.key, [r.model_dump() for r in results])))
+
+    def on_job_failed(job: AttackJob, exc: BaseException):
+        out.put(("job_failed", shard_id, job.key))
+
+    async with ClientFactory(options.http, scan_id=scan_id) as factory:
+        # лимиты по хостам у каждого шарда свои (доля общего) — координатор их складывает
+        on_rate_change = lambda limits: out.put(("rate", shard_id, limits))
+        async with attack_client(factory, f"{scan_id}/{shard_id}", options, on_rate_change) as client:
+            scheduler = AttackScheduler(
+                scan_id,
+                client,
+                concurrency=options.concurrency,
+                per_host=options.per_host,
+                on_job_done=on_job_done,
+                collect=False,
+                on_job_failed=on_job_failed,
+            )
+            plan = build_plan(eps, ctxs, [by_name[n] for n in attack_names], frozenset(skip), scan_id)
+            out.put(("planned", shard_id, len(plan.jobs)))
+            try:
+                await scheduler.run(plan.jobs)
+            finally:
+                if store is not None:
+                    store.flush()
+
+
+async def run_sharded(
+    scan_id: str,
+    endpoints: List[Endpoint],
+    contexts: List[AuthContext],
+    attacks: List[AttackStrategy],
+    options: ScanOptions,
+    status: dict,
+    skip: AbstractSet[str] = frozenset(),
+    on_job_done: Optional[Callable[[str, List[AttackResult]], None]] = None,
+    collect: bool = True,
+    total: Optional[int] = None,
+    on_job_failed: Optional[Callable[[str], None]] = None,
+) -> List[AttackResult]:
+    """
+    Раскидать план endpoint × context × attack по пулу процессов и собрать
+    находки в один список. Прогресс в status обновляется по мере выполнения задач.
+    skip — ключи уже выполненных задач, on_job_done(key, results) — для чекпоинтов
+    и потоковой записи; при collect=False находки в списке не копятся.
+    on_job_failed(key) — задача упала и выполненной не считается.
+    Если шард упал или умер, его невыполненные задачи тоже считаются упавшими
+    (status["failed"]), а сам шард — в status["failed_shards"]: скан завершится
+    как partial и его можно продолжить.
+    total — точный размер работы из fuzzer.planner (каждый шард строит свой план сам);
+    без него берётся верхняя оценка endpoints × contexts × attacks.
+    """
+    shards = shard_endpoints(endpoints, max(1, options.workers))
+    if total is None:
+        total = len(endpoints) * len(contexts) * len(attacks)
+    status["total"] = max(1, total)
+
+    # spawn, а не fork: родитель — процесс uvicorn с работающим event loop'ом и потоками
+    mp_ctx = mp.get_context("spawn")
+    out = mp_ctx.Queue()
+    procs = [
+        mp_ctx.Process(
+            target=_shard_main,
+            args=(
+                shard_id,
+                scan_id,
+                [ep.model_dump() for ep in shard],
+                [c.model_dump() for c in contexts],
+                [a.name for a in attacks],
+                shard_options(options, len(shards), shard_id),
+                list(skip),
+                out,
+            ),
+            name=f"scan-{scan_id}-shard-{shard_id}",
+            daemon=True,
+        )
+        for shard_id, shard in enumerate(shards)
+    ]
+    for p in procs:
+        p.start()
+
+    log.info(f"[SCAN {scan_id}] Sharded {len(endpoints)} endpoints across {len(procs)} workers")
+
+    issues: List[AttackResult] = []
+    done = status.get("done", 0)
+    failed = status.get("failed", 0)
+    running = set(range(len(procs)))
+    rate_limits: Dict[int, Dict[str, int]] = {}
+    # сколько задач шард запланировал и сколько из них отчитал
+    planned: Dict[int, int] = {}
+    reported: Dict[int, int] = {shard_id: 0 for shard_id in running}
+
+    def shard_lost(shard_id: int, reason: str):
+        nonlocal failed
+        running.discard(shard_id)
+        lost = max(0, planned.get(shard_id, 0) - reported[shard_id])
+        failed += lost
+        status["failed"] = failed
+        status["failed_shards"] = status.get("failed_shards", 0) + 1
+        log.error(f"[SCAN {scan_id}] shard {shard_id} {reason}; {lost} of its jobs not done")
+
+    try:
+        while running:
+            try:
+                kind, shard_id, payload = await asyncio.to_thread(out.get, True, POLL_INTERVAL)
+            except queue.Empty:
+                # процесс мог умереть, не успев ничего сообщить
+                for shard_id in list(running):
+                    if not procs[shard_id].is_alive() and procs[shard_id].exitcode not in (None, 0):
+                        shard_lost(shard_id, f"died with exit code {procs[shard_id].exitcode}")
+                continue
+
+            if kind in ("job", "job_failed"):
+                reported[shard_id] += 1
+            if kind == "job":
+                key, raw = payload
+                results = [AttackResult(**r) for r in raw]
+                done += 1
+                if collect:
+                    issues.extend(results)
+                if on_job_done is not None:
+                    on_job_done(key, results)
+                status["done"] = done
+                status["progress"] = done / max(1, total)
+            elif kind == "job_failed":
+                done += 1
+                failed += 1
+                if on_job_failed is not None:
+                    on_job_failed(payload)
+                status["done"] = done
+                status["failed"] = failed
+                status["progress"] = done / max(1, total)
+            elif kind == "planned":
+                planned[shard_id] = payload
+            elif kind == "rate":
+                rate_limits[shard_id] = payload
+                total_limits: Dict[str, int] = {}
+                for limits in rate_limits.values():
+                    for host, limit in limits.items():
+                        total_limits[host] = total_limits.get(host, 0) + limit
+                status["rate_limits"] = total_limits
+            elif kind == "finished":
+                running.discard(shard_id)
+            elif kind == "failed":
+                shard_lost(shard_id, f"failed:\n{payload}")
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        for p in procs:
+            await asyncio.to_thread(p.join)
+
+    return issues
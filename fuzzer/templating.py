@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Tuple
+
+from fuzzer.models import Endpoint
+
+DEFAULT_REPRESENTATIVES = 3
+
+# порядок важен: первый совпавший шаблон побеждает
+_SEGMENT_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"^\d+$"), "{id}"),
+    (re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I), "{uuid}"),
+    (re.compile(r"^[0-9a-f]{16,}$", re.I), "{hash}"),
+    # длинные токены/слаги с цифрами: base64url, случайные идентификаторы
+    (re.compile(r"^(?=.*\d)(?=.*[A-Za-z])[A-Za-z0-9_\-]{20,}$"), "{token}"),
+]
+
+
+def template_segment(segment: str) -> str:
+    if not segment:
+        return segment
+
+    # 12.jpg → {id}.jpg: расширение оставляем как есть
+    stem, dot, ext = segment.rpartition(".")
+    if not dot or not stem or not ext.isalnum():
+        stem, dot, ext = segment, "", ""
+
+    for pattern, placeholder in _SEGMENT_PATTERNS:
+        if pattern.match(stem):
+            return placeholder + dot + ext
+    return segment
+
+
+def template_path(path: str) -> str:
+    """/rest/products/12 → /rest/products/{id}"""
+    return "/".join(template_segment(s) for s in path.split("/"))
+
+
+def endpoint_template_key(ep: Endpoint) -> Tuple[str, str, str]:
+    return ep.method, ep.base_url, template_path(ep.path)
+
+
+def collapse_endpoints(endpoints: List[Endpoint], representatives: int = DEFAULT_REPRESENTATIVES) -> List[Endpoint]:
+    """
+    Сгруппировать эндпоинты по шаблону пути и оставить не больше representatives
+    конкретных представителей на шаблон. Предпочтение — эндпоинтам с авторизацией
+    (на них применимы атаки), затем порядку появления в логе.
+    representatives <= 0 — без свёртки.
+    """
+    if representatives <= 0:
+        return endpoints
+
+    groups: Dict[Tuple[str, str, str], List[Endpoint]] = {}
+    for ep in endpoints:
+        groups.setdefault(endpoint_template_key(ep), []).append(ep)
+
+    collapsed: List[Endpoint] = []
+    for (_, _, template), members in groups.items():
+        # sorted стабилен — внутри равных сохраняется порядок лога
+        members = sorted(members, key=lambda e: (not e.has_auth_header, not e.has_auth_cookie))
+        for ep in members[:representatives]:
+            ep.template = template
+            collapsed.append(ep)
+    return collapsed
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+INDEX_DIR = ".wordlist-index"
+
+# запись индекса: номер словаря (старшие 16 бит) и смещение строки в нём (младшие 48)
+_RECORD = struct.Struct("<Q")
+_OFFSET_BITS = 48
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+
+# сколько payload'ов отправляется одновременно
+DEFAULT_BATCH = 8
+
+# ожидаемая доля ложных срабатываний фильтра: столько уникальных строк может потеряться
+DEFAULT_ERROR_RATE = 1e-4
+
+
+class BloomFilter:
+    """Компактное вероятностное множество: без ложных отрицаний, ложные срабатывания с долей error_rate."""
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: bytes) -> Iterator[int]:
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: bytes) -> bool:
+        """Добавить элемент. Возвращает False, если он (вероятно) уже был."""
+        new = False
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+        return new
+
+    def __contains__(self, item: bytes) -> bool:
+        return all(self._bits[p // 8] & (1 << (p % 8)) for p in self._positions(item))
+
+
+def _iter_lines(mm: mmap.mmap, start: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """(смещение, строка без перевода строки) по mmap, начиная со start; пустые строки пропускаются."""
+    pos = start
+    size = len(mm)
+    while pos < size:
+        end = mm.find(b"\n", pos)
+        if end < 0:
+            end = size
+        line = mm[pos:end].rstrip(b"\r")
+        if line:
+            yield pos, line
+        pos = end + 1
+
+
+def _count_lines(mm: mmap.mmap, window: int = 1 << 20) -> int:
+    return sum(mm[i:i + window].count(b"\n") for i in range(0, len(mm), window)) + 1
+
+
+def _map(path: Path, stack: ExitStack) -> Optional[mmap.mmap]:
+    f = stack.enter_context(path.open("rb"))
+    if os.fstat(f.fileno()).st_size == 0:
+        return None  # пустой файл mmap не отображает
+    return stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class PayloadSource:
+    """
+    Поток payload'ов из словарей (SecLists, PayloadsAllTheThings, fuzzdb...) без загрузки в память.
+
+    Словари читаются через mmap. При первом обращении строится индекс — файл
+    с позициями уникальных строк во всех словарях по порядку; дубли внутри и между
+    словарями отсекаются фильтром Блума. Индекс лежит в INDEX_DIR и переиспользуется,
+    пока словари не изменились (ключ — пути, размеры и mtime).
+
+    Payload'ы нумеруются порядковыми номерами по индексу, так что перебор можно
+    продолжить с точной позиции: payloads(start=n).
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str | Path],
+        dedupe: bool = True,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        index_dir: str | Path = INDEX_DIR,
+    ):
+        self.paths: List[Path] = [Path(p).resolve() for p in paths]
+        self.dedupe = dedupe
+        self.error_rate = error_rate
+        self.index_dir = Path(index_dir)
+        self._index_path: Optional[Path] = None
+
+    def _fingerprint(self) -> str:
+        h = hashlib.sha1(f"dedupe={self.dedupe}".encode())
+        for p in self.paths:
+            st = p.stat()
+            h.update(f"\0{p}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+        return h.hexdigest()
+
+    @property
+    def index_path(self) -> Path:
+        if self._index_path is None:
+            self._index_path = self.index_dir / f"{self._fingerprint()}.idx"
+            if not self._index_path.exists():
+                self._build_index(self._index_path)
+        return self._index_path
+
+    def __len__(self) -> int:
+        return self.index_path.stat().st_size // _RECORD.size
+
+    def _build_index(self, dest: Path):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_suffix(f".{os.getpid()}.tmp")
+
+        seen = None
+        if self.dedupe:
+            # ёмкость фильтра — число строк во всех словарях, считается окнами по mmap
+            capacity = 0
+            with ExitStack() as stack:
+                for p in self.paths:
+                    mm = _map(p, stack)
+                    if mm is not None:
+                        capacity += _count_lines(mm)
+            seen = BloomFilter(capacity, self.error_rate)
+
+        with open(tmp, "wb", buffering=1 << 20) as out, ExitStack() as stack:
+            for list_idx, p in enumerate(self.paths):
+                mm = _map(p, stack)
+                if mm is None:
+                    continue
+                for offset, line in _iter_lines(mm):
+                    if seen is not None and not seen.add(line):
+                        continue
+                    out.write(_RECORD.pack((list_idx << _OFFSET_BITS) | offset))
+
+        # несколько процессов могут строить один индекс — побеждает последний, содержимое одинаковое
+        os.replace(tmp, dest)
+
+    def payloads(self, start: int = 0) -> Iterator[Tuple[int, str]]:
+        """Ленивый перебор (порядковый номер, payload), начиная с номера start."""
+        with ExitStack() as stack:
+            index = _map(self.index_path, stack)
+            if index is None:
+                return
+            lists = [_map(p, stack) for p in self.paths]
+
+            for n in range(max(0, start), len(index) // _RECORD.size):
+                (record,) = _RECORD.unpack_from(index, n * _RECORD.size)
+                mm = lists[record >> _OFFSET_BITS]
+                offset = record & _OFFSET_MASK
+                end = mm.find(b"\n", offset)
+                line = mm[offset:end if end >= 0 else len(mm)].rstrip(b"\r")
+                yield n, line.decode("utf-8", "replace")
+
+    def batches(self, size: int, start: int = 0, limit: int = 0) -> Iterator[List[Tuple[int, str]]]:
+        """payloads() пачками по size; limit > 0 — не больше limit payload'ов."""
+        batch: List[Tuple[int, str]] = []
+        for i, item in enumerate(self.payloads(start)):
+            if limit and i >= limit:
+                break
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
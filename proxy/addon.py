@@ -1,39 +1,398 @@
-from mitmproxy import http
+from mitmproxy import ctx, http
 from urllib.parse import urlparse, parse_qs
+import asyncio
+import fnmatch
+import gzip
 import json
+import os
+import queue
+import shutil
+import threading
 import time
 
 LOG_FILE = "proxy_log.jsonl"
 
+# трафик сканов: traffic/<scan_id>/<host>_<port>.jsonl, сегмент на скан и хост
+TRAFFIC_DIR = "traffic"
+# заголовок, которым fuzzer помечает трафик разведки своего скана (до цели не доходит)
+SCAN_HEADER = "X-Fuzzer-Recon"
+# запрос с этим заголовком до цели не доходит: Recorder сбрасывает на диск всё, что
+# записал для скана, и отвечает 204 с FLUSH_ACK (числом сброшенных сегментов)
+FLUSH_HEADER = "X-Fuzzer-Flush"
+FLUSH_ACK = "X-Fuzzer-Flushed"
+FLUSH_TIMEOUT = 10.0
+
+
+def host_key(host: str, port) -> str:
+    return f"{host}_{port}".replace("/", "_").replace(":", "_")
+
+
+# статика: разведке эндпоинтов и авторизации она ничего не даёт
+DEFAULT_DENY_EXTENSIONS = ".js,.mjs,.css,.map,.png,.jpg,.jpeg,.gif,.svg,.ico,.webp,.bmp,.woff,.woff2,.ttf,.otf,.eot,.mp4,.webm,.mp3"
+DEFAULT_DENY_TYPES = "image/,font/,audio/,video/,text/css,text/javascript,application/javascript,application/font-"
+
+
+def _split(value: str) -> tuple:
+    return tuple(v.strip().lower() for v in value.split(",") if v.strip())
+
+
+def _body(content, cap: int):
+    """Тело как текст, не длиннее cap байт (0 — без ограничения)."""
+    if not content:
+        return None
+    if cap and len(content) > cap:
+        content = content[:cap]
+    return content.decode("utf-8", "replace")
+
+
+class BufferedLogWriter:
+    """
+    Запись лога в фоновом потоке: event loop mitmproxy только кладёт запись в очередь,
+    сериализация и диск — здесь. Записи пишутся пачками (по размеру или по времени).
+    При segment_size > 0 файл ротируется, закрытые сегменты можно сжимать в gzip.
+    previous — писатель того же файла, который ещё запечатывает его: поток сначала
+    дожидается его, и только потом открывает файл.
+    """
+
+    def __init__(self, path: str = LOG_FILE, batch_size: int = 256, flush_interval: float = 0.5,
+                 segment_size: int = 0, compress: bool = False, previous=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+        self.compress = compress
+        self._previous = previous
+
+        self._queue = queue.SimpleQueue()
+        self._stop = object()
+        self._seal = object()
+        self._thread = threading.Thread(target=self._run, name="recorder-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, entry: dict):
+        self._queue.put(entry)
+
+    def flush(self) -> threading.Event:
+        """Сбросить на диск всё, что уже в очереди; событие взводится, когда данные записаны."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done
+
+    def seal(self):
+        """
+        Закрыть писатель, не дожидаясь его: поток дописывает очередь, переносит файл
+        в закрытый сегмент (сжатый при compress) и завершается. Ждать — через join().
+        """
+        self._queue.put(self._seal)
+
+    def join(self, timeout=None) -> bool:
+        """Дождаться завершения потока; False — не успел за timeout."""
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def close(self, seal: bool = False):
+        """seal — после закрытия перенести текущий файл в закрытый сегмент (сжатый при compress)."""
+        self._queue.put(self._seal if seal else self._stop)
+        self._thread.join()
+
+    def _run(self):
+        if self._previous is not None:
+            self._previous.join()
+            self._previous = None
+        f = open(self.path, "a", encoding="utf-8")
+        batch = []
+        waiters = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        sealing = False
+
+        while not stopping:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is self._stop or item is self._seal:
+                    stopping = True
+                    sealing = item is self._seal
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    try:
+                        batch.append(json.dumps(item, ensure_ascii=False) + "\n")
+                    except Exception as e:
+                        print("proxy error:", e)
+            except queue.Empty:
+                pass
+
+            if stopping or waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    try:
+                        f.write("".join(batch))
+                        f.flush()
+                    except Exception as e:
+                        print("proxy error:", e)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+                if stopping:
+                    break
+
+                # ротация до ответа ждущим: иначе fuzzer начнёт читать сегмент,
+                # пока он переименовывается и сжимается
+                if self.segment_size and f.tell() >= self.segment_size:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, "a", encoding="utf-8")
+                for done in waiters:
+                    done.set()
+                waiters = []
+
+        f.close()
+        # ждущие сброса узнают о нём, когда сегмент уже сжат: до этого fuzzer
+        # мог бы прочитать и несжатый файл, и недописанный .gz
+        if sealing and os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._rotate()
+        for done in waiters:
+            done.set()
+
+    def _rotate(self):
+        stamp = int(time.time() * 1000)
+        while os.path.exists(f"{self.path}.{stamp}") or os.path.exists(f"{self.path}.{stamp}.gz"):
+            stamp += 1
+        segment = f"{self.path}.{stamp}"
+        os.replace(self.path, segment)
+        if not self.compress:
+            return
+        try:
+            with open(segment, "rb") as src, gzip.open(segment + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(segment)
+        except Exception as e:
+            print("proxy error:", e)
+
+
 class Recorder:
+    """
+    Запись трафика через прокси. Поток, помеченный SCAN_HEADER, пишется в сегмент
+    своего скана и хоста (traffic/<scan_id>/<host>_<port>.jsonl) — fuzzer читает только
+    его. Непомеченный трафик (ручная разведка через прокси) — в общий proxy_log.jsonl.
+    Сегменты, в которые давно не писали, закрываются и сжимаются в потоке писателя,
+    не задерживая event loop прокси.
+
+    Правила захвата (опции recorder_*): разрешённые хосты, запрет по расширению пути
+    и Content-Type ответа, пропуск повторов (опрос) в пределах окна, ограничение
+    размера тел. По умолчанию поток пишется одной записью (stage "flow") после ответа.
+    """
+
     def __init__(self):
-        self.f = open(LOG_FILE, "a", encoding="utf-8")
+        self.writer = None
+        self.scan_writers = {}
+        # писатели, которые ещё запечатывают свой сегмент: (scan_id, host) -> писатель
+        self._sealing = {}
+        self._last_write = {}
+        self._last_sweep = time.monotonic()
+        self._recent = {}
+        self.hosts = ()
+        self.deny_extensions = _split(DEFAULT_DENY_EXTENSIONS)
+        self.deny_types = _split(DEFAULT_DENY_TYPES)
+
+    def load(self, loader):
+        loader.add_option("recorder_batch_size", int, 256, "Записей в одной пачке на диск")
+        loader.add_option("recorder_flush_interval", float, 0.5, "Максимальная задержка записи, сек")
+        loader.add_option("recorder_segment_size", int, 0, "Размер сегмента лога в байтах (0 — без ротации)")
+        loader.add_option("recorder_compress", bool, False, "Сжимать закрытые сегменты gzip")
+        loader.add_option("recorder_idle_seal", float, 120.0,
+                          "Закрывать и сжимать сегмент скана после стольких секунд без записи (0 — не закрывать)")
+        loader.add_option("recorder_hosts", str, "",
+                          "Записывать только эти хосты, через запятую, допускаются маски (*.example.com); пусто — все")
+        loader.add_option("recorder_deny_extensions", str, DEFAULT_DENY_EXTENSIONS,
+                          "Не записывать пути с этими расширениями, через запятую")
+        loader.add_option("recorder_deny_types", str, DEFAULT_DENY_TYPES,
+                          "Не записывать ответы с Content-Type, начинающимся с этих префиксов")
+        loader.add_option("recorder_merge", bool, True,
+                          "Одна запись на поток (после ответа) вместо отдельных request/response")
+        loader.add_option("recorder_repeat_window", float, 5.0,
+                          "Не записывать повтор того же запроса (метод, URL, авторизация, тело) в течение стольких секунд")
+        loader.add_option("recorder_max_req_body", int, 16384, "Максимум байт тела запроса в записи (0 — без ограничения)")
+        loader.add_option("recorder_max_resp_body", int, 4096, "Максимум байт тела ответа в записи (0 — без ограничения)")
+
+    def configure(self, updated):
+        if self.writer is not None and not any(o.startswith("recorder_") for o in updated):
+            return
+        opts = ctx.options
+        self.hosts = _split(opts.recorder_hosts)
+        self.deny_extensions = _split(opts.recorder_deny_extensions)
+        self.deny_types = _split(opts.recorder_deny_types)
+        if self.writer is not None and not any(
+            name in updated for name in ("recorder_batch_size", "recorder_flush_interval",
+                                         "recorder_segment_size", "recorder_compress")
+        ):
+            return  # поменялись только правила захвата — писатели не трогаем
+        if self.writer is not None:
+            self.writer.close()
+        self._close_scan_writers()
+        self.writer = BufferedLogWriter(
+            LOG_FILE,
+            batch_size=ctx.options.recorder_batch_size,
+            flush_interval=ctx.options.recorder_flush_interval,
+            segment_size=ctx.options.recorder_segment_size,
+            compress=ctx.options.recorder_compress,
+        )
+
+    def done(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self._close_scan_writers()
+
+    def _scan_writer(self, scan_id: str, host: str, port) -> BufferedLogWriter:
+        key = (scan_id, host_key(host, port))
+        writer = self.scan_writers.get(key)
+        if writer is None:
+            scan_dir = os.path.join(TRAFFIC_DIR, scan_id)
+            os.makedirs(scan_dir, exist_ok=True)
+            writer = BufferedLogWriter(
+                os.path.join(scan_dir, key[1] + ".jsonl"),
+                batch_size=ctx.options.recorder_batch_size,
+                flush_interval=ctx.options.recorder_flush_interval,
+                segment_size=ctx.options.recorder_segment_size,
+                compress=True,
+                previous=self._sealing.pop(key, None),
+            )
+            self.scan_writers[key] = writer
+        self._last_write[key] = time.monotonic()
+        return writer
 
-    def request(self, flow: http.HTTPFlow):
-        self._log(flow, "request")
+    def _seal_idle(self):
+        idle = ctx.options.recorder_idle_seal
+        now = time.monotonic()
+        if now - self._last_sweep < 1.0:
+            return
+        self._last_sweep = now
+
+        window = ctx.options.recorder_repeat_window
+        self._recent = {k: t for k, t in self._recent.items() if now - t < window}
+        self._sealing = {k: w for k, w in self._sealing.items() if not w.join(0)}
+
+        if not idle:
+            return
+        for key, last in list(self._last_write.items()):
+            if now - last >= idle:
+                # сжатие — в потоке писателя, event loop не ждёт
+                writer = self.scan_writers.pop(key)
+                writer.seal()
+                self._sealing[key] = writer
+                del self._last_write[key]
+
+    def _close_scan_writers(self):
+        for writer in self.scan_writers.values():
+            writer.close(seal=True)
+        for writer in self._sealing.values():
+            writer.join()
+        self.scan_writers.clear()
+        self._sealing.clear()
+        self._last_write.clear()
+
+    def _in_scope(self, flow: http.HTTPFlow) -> bool:
+        req = flow.request
+        host = (req.pretty_host or req.host or "").lower()
+        if self.hosts and not any(fnmatch.fnmatchcase(host, h) for h in self.hosts):
+            return False
+
+        path = req.path.split("?", 1)[0].lower()
+        if self.deny_extensions and path.endswith(self.deny_extensions):
+            return False
+
+        window = ctx.options.recorder_repeat_window
+        if window > 0:
+            # тело входит в ключ: два POST с разными данными — не повтор
+            key = (
+                flow.metadata.get("fuzzer_scan"), req.method, req.url,
+                req.headers.get("authorization"), req.headers.get("cookie"),
+                hash(req.raw_content) if req.raw_content else None,
+            )
+            now = time.monotonic()
+            last = self._recent.get(key)
+            self._recent[key] = now
+            if last is not None and now - last < window:
+                return False
+        return True
+
+    async def _flush_scan(self, flow: http.HTTPFlow, scan_id):
+        if scan_id:
+            writers = [w for (sid, _), w in self.scan_writers.items() if sid == scan_id]
+            sealing = [w for (sid, _), w in self._sealing.items() if sid == scan_id]
+        else:
+            writers = [self.writer] if self.writer is not None else []
+            sealing = []
+        events = [w.flush() for w in writers]
+        # ждём в отдельном потоке — event loop прокси продолжает обслуживать трафик;
+        # запечатываемые сегменты тоже дожидаемся, иначе fuzzer прочтёт недописанный .gz
+        waits = [lambda e=e: e.wait(FLUSH_TIMEOUT) for e in events]
+        waits += [lambda w=w: w.join(FLUSH_TIMEOUT) for w in sealing]
+        ok = await asyncio.to_thread(lambda: all([wait() for wait in waits]))
+        flow.response = http.Response.make(204 if ok else 504, b"", {FLUSH_ACK: str(len(waits))})
+
+    async def request(self, flow: http.HTTPFlow):
+        # метка скана снимается до отправки цели и живёт в метаданных потока
+        scan_id = flow.request.headers.pop(SCAN_HEADER, None)
+        if scan_id and all(c.isalnum() or c in "-_" for c in scan_id):
+            flow.metadata["fuzzer_scan"] = scan_id
+        else:
+            scan_id = None
+
+        if flow.request.headers.pop(FLUSH_HEADER, None) is not None:
+            # служебный запрос fuzzer'а: сам не записывается
+            flow.metadata["fuzzer_skip"] = True
+            await self._flush_scan(flow, scan_id)
+            return
+
+        if not self._in_scope(flow):
+            flow.metadata["fuzzer_skip"] = True
+            return
+        if not ctx.options.recorder_merge:
+            self._log(flow, "request")
 
     def response(self, flow: http.HTTPFlow):
-        self._log(flow, "response")
+        if flow.metadata.get("fuzzer_skip"):
+            return
+        ctype = (flow.response.headers.get("content-type") or "").lower()
+        if self.deny_types and ctype.startswith(self.deny_types):
+            return
+        self._log(flow, "flow" if ctx.options.recorder_merge else "response")
+
+    def error(self, flow: http.HTTPFlow):
+        # ответа не будет — в режиме слияния запрос иначе потерялся бы
+        if ctx.options.recorder_merge and flow.response is None and not flow.metadata.get("fuzzer_skip"):
+            self._log(flow, "flow")
 
     def _log(self, flow: http.HTTPFlow, stage: str):
+        if self.writer is None:
+            return
         try:
             parsed = urlparse(flow.request.url)
+            scan_id = flow.metadata.get("fuzzer_scan")
             entry = {
                 "t": time.time(),
                 "stage": stage,
+                "scan_id": scan_id,
                 "method": flow.request.method,
+                "scheme": parsed.scheme,
                 "host": parsed.hostname,
+                "port": parsed.port,
                 "path": parsed.path,
                 "query": parse_qs(parsed.query),
                 "req_headers": dict(flow.request.headers),
-                "req_body": flow.request.get_text(),
+                "req_body": _body(flow.request.get_content(strict=False), ctx.options.recorder_max_req_body),
                 "status": flow.response.status_code if flow.response else None,
                 "resp_headers": dict(flow.response.headers) if flow.response else None,
-                "resp_body": flow.response.get_text()[:4096] if flow.response else None,
+                "resp_body": _body(flow.response.get_content(strict=False), ctx.options.recorder_max_resp_body)
+                if flow.response else None,
             }
-            self.f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            self.f.flush()
+            if scan_id:
+                self._scan_writer(scan_id, flow.request.host, flow.request.port).put(entry)
+            else:
+                self.writer.put(entry)
+            self._seal_idle()
         except Exception as e:
             print("proxy error:", e)
 
-addons = [Recorder()]
\ No newline at end of file
+addons = [Recorder()]